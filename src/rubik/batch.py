@@ -0,0 +1,134 @@
+from __future__ import annotations
+from typing import Generator, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from rubik.permutation import DensePermutation, Permutation
+
+
+class PermutationBatch:
+    """ Набор из N перестановок на точках 0..n-1, записанный матрицей (N, n).
+
+    Строка i матрицы это таблица образов i-й перестановки. Все операции
+    выполняются над всеми строками сразу через fancy indexing numpy. Порядок
+    умножения тот же, что у Permutation: в p * q сперва действует p. """
+
+    def __init__(self, matrix):
+        matrix = np.asarray(matrix)
+        if matrix.ndim != 2:
+            raise ValueError("Batch matrix must have shape (N, degree).")
+        if matrix.shape[1] > 256:
+            raise ValueError("Batch supports permutations of degree <= 256.")
+        if not np.issubdtype(matrix.dtype, np.integer):
+            raise ValueError("Batch matrix must contain integers.")
+        n = matrix.shape[1]
+        if ((matrix < 0) | (matrix >= n)).any() or \
+                (np.sort(matrix, axis=1) != np.arange(n)).any():
+            raise ValueError("Batch rows aren't permutations.")
+        self.matrix = matrix.astype(np.uint8, copy=False)
+
+    @classmethod
+    def _from_matrix(cls, matrix: np.ndarray) -> PermutationBatch:
+        """ Создать набор из готовой матрицы uint8 без проверок. """
+        batch = cls.__new__(cls)
+        batch.matrix = matrix
+        return batch
+
+    @classmethod
+    def from_permutations(
+        cls,
+        perms: Iterable[Union[DensePermutation, Permutation]],
+        n: Optional[int] = None,
+    ) -> PermutationBatch:
+        """ Собрать набор из плотных или словарных перестановок. Степень n
+        не может быть меньше степени перестановок набора. """
+        dense = [p if isinstance(p, DensePermutation)
+                 else DensePermutation.from_permutation(p) for p in perms]
+        if n is None:
+            n = max([p.n for p in dense], default=0)
+        if n > 256:
+            raise ValueError("Batch supports permutations of degree <= 256.")
+        matrix = np.empty((len(dense), n), dtype=np.uint8)
+        for i, p in enumerate(dense):
+            if any(p.apply(x) != x for x in range(n, p.n)):
+                raise ValueError(f"Permutation {p} moves points >= {n}.")
+            matrix[i] = np.frombuffer(p._table, dtype=np.uint8, count=n)
+        return cls._from_matrix(matrix)
+
+    @classmethod
+    def identity(cls, size: int, n: int) -> PermutationBatch:
+        """ Набор из size тождественных перестановок степени n. """
+        row = np.arange(n, dtype=np.uint8)
+        return cls._from_matrix(np.broadcast_to(row, (size, n)).copy())
+
+    @property
+    def degree(self) -> int:
+        return self.matrix.shape[1]
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def __getitem__(self, i: int) -> DensePermutation:
+        return DensePermutation._from_images(self.matrix[i].tobytes())
+
+    def __mul__(self, batch: PermutationBatch) -> PermutationBatch:
+        """ Построчное произведение. Набор из одной перестановки умножается
+        на каждую строку другого набора. """
+        if self.degree != batch.degree:
+            raise ValueError("Batches have different degrees.")
+        if len(batch) == 1:
+            return PermutationBatch._from_matrix(
+                batch.matrix[0][self.matrix])
+        if len(self) == 1:
+            return PermutationBatch._from_matrix(batch.matrix[:, self.matrix[0]])
+        return PermutationBatch._from_matrix(np.take_along_axis(
+            batch.matrix, self.matrix.astype(np.intp), axis=1))
+
+    def __truediv__(self, batch: PermutationBatch) -> PermutationBatch:
+        return self * batch.inverse()
+
+    def inverse(self) -> PermutationBatch:
+        """ Обратные перестановки. """
+        inv = np.empty_like(self.matrix)
+        rows = np.arange(len(self))[:, None]
+        inv[rows, self.matrix] = np.arange(self.degree, dtype=np.uint8)
+        return PermutationBatch._from_matrix(inv)
+
+    def __pow__(self, k: int) -> PermutationBatch:
+        """ Степень всех перестановок набора. Порядок строк разный, поэтому
+        вместо поворота циклов используется возведение квадратами: O(log k)
+        векторных сборов, для k = 2 ровно один. """
+        perm = self.inverse() if k < 0 else self
+        cum = None
+        k = abs(k)
+        while k > 0:
+            k, e = divmod(k, 2)
+            if e == 1:
+                cum = perm if cum is None else cum * perm
+            if k > 0:
+                perm *= perm
+        if cum is None:
+            return PermutationBatch.identity(len(self), self.degree)
+        return cum
+
+    def support(self) -> np.ndarray:
+        """ Количество точек, которые затрагивает каждая перестановка. """
+        return (self.matrix != np.arange(self.degree)).sum(axis=1)
+
+    def cross(
+        self,
+        batch: PermutationBatch,
+        chunk_size: int = 1 << 16,
+    ) -> Generator[Tuple[np.ndarray, np.ndarray, PermutationBatch], None, None]:
+        """ Перебрать все произведения self[i] * batch[j] порциями по
+        chunk_size пар. Пары идут в порядке itertools.product, для каждой
+        порции возвращаются индексы i, j и набор произведений. """
+        if self.degree != batch.degree:
+            raise ValueError("Batches have different degrees.")
+        total = len(self) * len(batch)
+        for start in range(0, total, chunk_size):
+            flat = np.arange(start, min(start + chunk_size, total))
+            i, j = np.divmod(flat, len(batch))
+            left = self.matrix[i].astype(np.intp)
+            yield i, j, PermutationBatch._from_matrix(
+                np.take_along_axis(batch.matrix[j], left, axis=1))
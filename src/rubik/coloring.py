@@ -79,7 +79,13 @@ def rotate(vect: Vector, axis: Color) -> Vector:
     """ Развернуть вектор относительно оси. """
     if sum([a * b for a, b in zip(axis.value, vect)]) != 1:
         return vect
+    return turn(vect, axis)
 
+
+def turn(vect: Vector, axis: Color) -> Vector:
+    """ Повернуть вектор вокруг оси грани axis на 90 градусов по часовой
+    стрелке, не проверяя, что вектор лежит в слое грани. Нужно для нормалей
+    наклеек, которые поворачиваются вместе с кубиком. """
     i = abs(1 * axis.value.y) + abs(2 * axis.value.z)
     e = sum(axis.value)
     x, y, z = vect
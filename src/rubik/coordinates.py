@@ -0,0 +1,96 @@
+from math import factorial, perm
+from typing import List, Sequence, Tuple
+
+
+def lehmer_rank(seq: Sequence[int]) -> int:
+    """ Номер перестановки seq чисел 0..n-1 в лексикографическом порядке
+    (код Лемера). """
+    n = len(seq)
+    rank = 0
+    for i, x in enumerate(seq):
+        smaller = sum(1 for y in seq[i + 1:] if y < x)
+        rank += smaller * factorial(n - 1 - i)
+    return rank
+
+
+def lehmer_unrank(rank: int, n: int) -> List[int]:
+    """ Перестановка чисел 0..n-1 по ее номеру, обратно к lehmer_rank. """
+    if not 0 <= rank < factorial(n):
+        raise ValueError(f"Rank {rank} is out of range for degree {n}.")
+    rest = list(range(n))
+    seq = []
+    for i in range(n - 1, -1, -1):
+        d, rank = divmod(rank, factorial(i))
+        seq.append(rest.pop(d))
+    return seq
+
+
+def partial_rank(seq: Sequence[int], n: int) -> int:
+    """ Номер упорядоченной выборки seq из k различных чисел 0..n-1, число
+    в диапазоне [0, n! / (n - k)!). """
+    k = len(seq)
+    rank = 0
+    for i, x in enumerate(seq):
+        smaller = x - sum(1 for y in seq[:i] if y < x)
+        rank += smaller * perm(n - 1 - i, k - 1 - i)
+    return rank
+
+
+def partial_unrank(rank: int, n: int, k: int) -> List[int]:
+    """ Упорядоченная выборка по номеру, обратно к partial_rank. """
+    if not 0 <= rank < perm(n, k):
+        raise ValueError(f"Rank {rank} is out of range for {k} of {n}.")
+    rest = list(range(n))
+    seq = []
+    for i in range(k):
+        d, rank = divmod(rank, perm(n - 1 - i, k - 1 - i))
+        seq.append(rest.pop(d))
+    return seq
+
+
+def orientation_rank(ori: Sequence[int], base: int) -> int:
+    """ Номер вектора ориентаций. Сумма ориентаций кубика всегда кратна base,
+    поэтому последняя компонента определяется остальными и в номер не
+    входит: для углов (base=3) получаем 3^7 значений, для ребер 2^11. """
+    rank = 0
+    for x in ori[:-1]:
+        rank = rank * base + x
+    return rank
+
+
+def orientation_unrank(rank: int, n: int, base: int) -> List[int]:
+    """ Вектор ориентаций длины n по номеру, обратно к orientation_rank. """
+    if not 0 <= rank < base ** (n - 1):
+        raise ValueError(f"Rank {rank} is out of range for {n} cubies.")
+    ori = []
+    for _ in range(n - 1):
+        rank, x = divmod(rank, base)
+        ori.append(x)
+    ori.reverse()
+    ori.append(-sum(ori) % base)
+    return ori
+
+
+def subset_rank(slots: Sequence[int], ori: Sequence[int], n: int,
+                base: int) -> int:
+    """ Номер группы из k кубиков: упорядоченная выборка их слотов из n и
+    ориентации. Сумма ориентаций части кубиков ничем не ограничена, поэтому
+    в номер входят все k компонент, всего n! / (n - k)! * base^k значений. """
+    rank = partial_rank(slots, n)
+    for x in ori:
+        rank = rank * base + x
+    return rank
+
+
+def subset_unrank(rank: int, n: int, k: int, base: int) -> \
+        Tuple[List[int], List[int]]:
+    """ Слоты и ориентации группы кубиков по номеру, обратно к
+    subset_rank. """
+    if not 0 <= rank < perm(n, k) * base ** k:
+        raise ValueError(f"Rank {rank} is out of range for {k} of {n}.")
+    ori = []
+    for _ in range(k):
+        rank, x = divmod(rank, base)
+        ori.append(x)
+    ori.reverse()
+    return partial_unrank(rank, n, k), ori
@@ -0,0 +1,389 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from rubik.coloring import Color, Vector, cell, rotate, turn
+from rubik.coordinates import lehmer_rank, orientation_rank, partial_rank
+from rubik.coordinates import subset_rank
+from rubik.permutation import Permutation
+from rubik.representations import InvoluteRepresentation
+from rubik.state import Rubik
+
+# Слоты кубиков в порядке Rubik.cells: углы 0..7 (кубики 1..8) и ребра 0..11
+# (кубики 9..20).
+CORNERS = Rubik.cells[:8]
+EDGES = Rubik.cells[8:]
+
+# Ребра разбиты на три четверки, позиции каждой четверки это отдельная
+# координата: таблица на 12! состояний не помещается в память, а три
+# координаты по 12 * 11 * 10 * 9 значений вместе задают перестановку ребер.
+EDGE_SUBSETS = [range(0, 4), range(4, 8), range(8, 12)]
+
+# Углы для координат, где вместе с положениями хранятся ориентации: восемь
+# углов с ориентациями дают 8! * 3^7 состояний, а две четверки по
+# 8 * 7 * 6 * 5 * 3^4.
+CORNER_SUBSETS = [range(0, 4), range(4, 8)]
+
+
+def stickers(cell: Vector) -> List[Vector]:
+    """ Нормали наклеек кубика в позиции cell в порядке отсчета ориентации.
+
+    Первой идет опорная грань слота: ось z для углов и для ребер верхнего и
+    нижнего слоя, ось x для ребер среднего слоя. Наклейки угла перечисляются
+    по кругу в одном и том же направлении для всех углов (направление обхода
+    z, x, y меняется вместе со знаком x * y * z), поэтому повороты граней
+    складывают ориентации по модулю 3. """
+    x, y, z = cell
+    if cell.rank() == 3:
+        if x * y * z > 0:
+            return [Vector(0, 0, z), Vector(x, 0, 0), Vector(0, y, 0)]
+        return [Vector(0, 0, z), Vector(0, y, 0), Vector(x, 0, 0)]
+
+    normals = [Vector(x, 0, 0), Vector(0, y, 0), Vector(0, 0, z)]
+    normals = [v for v in normals if v.rank() > 0]
+    normals.sort(key=lambda v: (abs(v.z), abs(v.x)), reverse=True)
+    return normals
+
+
+class Move(NamedTuple):
+    """ Элементарное действие на кубиках с учетом ориентации. Для слота j:
+    в какой слот уходит стоящий в нем кубик и на сколько меняется его
+    ориентация (по модулю 3 для углов и 2 для ребер). """
+    corner_slot: bytes
+    corner_twist: bytes
+    edge_slot: bytes
+    edge_flip: bytes
+
+
+def _layer_move(cells: List[Vector], color: Color):
+    index = {c: i for i, c in enumerate(cells)}
+    slots, deltas = [], []
+    for cell in cells:
+        target = rotate(cell, color)
+        slots.append(index[target])
+        if target == cell:
+            deltas.append(0)
+            continue
+        normal = turn(stickers(cell)[0], color)
+        deltas.append(stickers(target).index(normal))
+    return bytes(slots), bytes(deltas)
+
+
+def _move(color: Color) -> Move:
+    corner_slot, corner_twist = _layer_move(CORNERS, color)
+    edge_slot, edge_flip = _layer_move(EDGES, color)
+    return Move(corner_slot, corner_twist, edge_slot, edge_flip)
+
+
+MOVES = {color.name: _move(color) for color in Color}
+
+
+def _translation(corner_slot: Sequence[int], corner_twist: Sequence[int],
+                 edge_slot: Sequence[int], edge_flip: Sequence[int]) -> bytes:
+    """ Таблица для bytes.translate, переводящая код (слот, ориентация)
+    кубика в код после действия. Углы кодируются числами slot * 3 + twist
+    (0..23), ребра числами 24 + slot * 2 + flip (24..47). """
+    table = bytearray(range(256))
+    for j in range(8):
+        for o in range(3):
+            table[j * 3 + o] = corner_slot[j] * 3 + (o + corner_twist[j]) % 3
+    for j in range(12):
+        for o in range(2):
+            table[24 + j * 2 + o] = 24 + edge_slot[j] * 2 + (o + edge_flip[j]) % 2
+    return bytes(table)
+
+
+_MOVE_TABLES = {key: _translation(*m) for key, m in MOVES.items()}
+
+
+class CubieState:
+    """ Компактное состояние кубика: для каждого из 20 кубиков его слот и
+    ориентация относительно опорной грани слота.
+
+    Состояние хранится строкой bytes из 20 кодов (см. _translation), поэтому
+    применение действия или другого состояния это один вызов
+    bytes.translate, а сравнение и хеш берутся от этой строки. Нумерация
+    кубиков и слотов та же, что у Rubik: перестановка кубик -> слот совпадает с
+    Rubik.permutation(). Объект неизменяемый. """
+
+    __slots__ = ('_codes',)
+
+    def __init__(
+        self,
+        corner_slots: Optional[Iterable[int]] = None,
+        corner_twist: Optional[Iterable[int]] = None,
+        edge_slots: Optional[Iterable[int]] = None,
+        edge_flip: Optional[Iterable[int]] = None,
+    ):
+        corner_slots = list(range(8) if corner_slots is None else corner_slots)
+        corner_twist = list([0] * 8 if corner_twist is None else corner_twist)
+        edge_slots = list(range(12) if edge_slots is None else edge_slots)
+        edge_flip = list([0] * 12 if edge_flip is None else edge_flip)
+
+        if sorted(corner_slots) != list(range(8)) or \
+                sorted(edge_slots) != list(range(12)):
+            raise ValueError("Slots of cubies aren't permutation.")
+        if len(corner_twist) != 8 or len(edge_flip) != 12 or \
+                not all(0 <= x < 3 for x in corner_twist) or \
+                not all(0 <= x < 2 for x in edge_flip):
+            raise ValueError("Wrong orientation of cubies.")
+
+        codes = [s * 3 + o for s, o in zip(corner_slots, corner_twist)]
+        codes += [24 + s * 2 + o for s, o in zip(edge_slots, edge_flip)]
+        object.__setattr__(self, '_codes', bytes(codes))
+
+    @classmethod
+    def _from_codes(cls, codes: bytes) -> CubieState:
+        state = cls.__new__(cls)
+        object.__setattr__(state, '_codes', codes)
+        return state
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CubieState is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError("CubieState is immutable.")
+
+    def __reduce__(self):
+        return CubieState._from_codes, (self._codes,)
+
+    @property
+    def corner_slots(self) -> Tuple[int, ...]:
+        """ Слоты углов 1..8 (отсчет от нуля). """
+        return tuple(c // 3 for c in self._codes[:8])
+
+    @property
+    def corner_twist(self) -> Tuple[int, ...]:
+        """ Ориентации углов 1..8 (0, 1 или 2). """
+        return tuple(c % 3 for c in self._codes[:8])
+
+    @property
+    def edge_slots(self) -> Tuple[int, ...]:
+        """ Слоты ребер 9..20 (отсчет от нуля). """
+        return tuple((c - 24) // 2 for c in self._codes[8:])
+
+    @property
+    def edge_flip(self) -> Tuple[int, ...]:
+        """ Ориентации ребер 9..20 (0 или 1). """
+        return tuple(c % 2 for c in self._codes[8:])
+
+    def act(self, color: Union[Color, str]) -> CubieState:
+        """ Применить элементарное действие. """
+        if isinstance(color, Color):
+            color = color.name
+        return CubieState._from_codes(
+            self._codes.translate(_MOVE_TABLES[color.upper()]))
+
+    def apply(self, ws: str) -> CubieState:
+        """ Применить последовательность действий слева направо. """
+        codes = self._codes
+        for w in ws.upper():
+            if w == ' ':
+                continue
+            table = _MOVE_TABLES.get(w)
+            if table is None:
+                raise ValueError(f"Unknown color in the word {ws}.")
+            codes = codes.translate(table)
+        return CubieState._from_codes(codes)
+
+    def __mul__(self, state: CubieState) -> CubieState:
+        """ Сперва действует self, затем state. """
+        return CubieState._from_codes(self._codes.translate(state._table()))
+
+    def _table(self) -> bytes:
+        return _translation(self.corner_slots, self.corner_twist,
+                            self.edge_slots, self.edge_flip)
+
+    def inverse(self) -> CubieState:
+        """ Обратное состояние. """
+        corner_slots, corner_twist = [0] * 8, [0] * 8
+        for c, (s, o) in enumerate(zip(self.corner_slots, self.corner_twist)):
+            corner_slots[s], corner_twist[s] = c, -o % 3
+        edge_slots, edge_flip = [0] * 12, [0] * 12
+        for c, (s, o) in enumerate(zip(self.edge_slots, self.edge_flip)):
+            edge_slots[s], edge_flip[s] = c, -o % 2
+        return CubieState(corner_slots, corner_twist, edge_slots, edge_flip)
+
+    def is_solved(self) -> bool:
+        return self._codes == _SOLVED
+
+    def is_valid(self) -> bool:
+        """ Проверить, что состояние собирается: суммы ориентаций кратны 3 и
+        2, а четности перестановок углов и ребер совпадают. """
+        if sum(self.corner_twist) % 3 or sum(self.edge_flip) % 2:
+            return False
+        return _parity(self.corner_slots) == _parity(self.edge_slots)
+
+    def permutation(self) -> Permutation:
+        """ Перестановка кубиков (кубик -> слот) как в Rubik.permutation. """
+        perm = {c + 1: s + 1 for c, s in enumerate(self.corner_slots)}
+        perm.update({c + 9: s + 9 for c, s in enumerate(self.edge_slots)})
+        return Permutation(perm)
+
+    def coordinates(self) -> dict[str, int]:
+        """ Координаты состояния для таблиц переходов rubik.tables. """
+        twist = [0] * 8
+        for s, o in zip(self.corner_slots, self.corner_twist):
+            twist[s] = o
+        flip = [0] * 12
+        for s, o in zip(self.edge_slots, self.edge_flip):
+            flip[s] = o
+
+        coords = {
+            'corner_perm': lehmer_rank(self.corner_slots),
+            'corner_twist': orientation_rank(twist, 3),
+            'edge_flip': orientation_rank(flip, 2),
+        }
+        edge_slots = self.edge_slots
+        for i, subset in enumerate(EDGE_SUBSETS):
+            coords[f'edge_perm_{i}'] = \
+                partial_rank([edge_slots[e] for e in subset], 12)
+            coords[f'edge_subset_{i}'] = subset_rank(
+                [edge_slots[e] for e in subset],
+                [self.edge_flip[e] for e in subset], 12, 2)
+        for i, subset in enumerate(CORNER_SUBSETS):
+            coords[f'corner_subset_{i}'] = subset_rank(
+                [self.corner_slots[c] for c in subset],
+                [self.corner_twist[c] for c in subset], 8, 3)
+        return coords
+
+    def __eq__(self, state) -> bool:
+        if not isinstance(state, CubieState):
+            return NotImplemented
+        return self._codes == state._codes
+
+    def __hash__(self) -> int:
+        return hash(self._codes)
+
+    def __repr__(self) -> str:
+        return (f"CubieState({list(self.corner_slots)}, "
+                f"{list(self.corner_twist)}, {list(self.edge_slots)}, "
+                f"{list(self.edge_flip)})")
+
+    @classmethod
+    def from_permutation(cls, p: Permutation) -> CubieState:
+        """ Состояние по перестановке кубик -> слот, ориентации нулевые. """
+        return cls([p.apply(c + 1) - 1 for c in range(8)], None,
+                   [p.apply(c + 9) - 9 for c in range(12)], None)
+
+    @classmethod
+    def from_rubik(cls, cube: Rubik) -> CubieState:
+        """ Состояние по Rubik. Rubik хранит только положения кубиков, поэтому
+        ориентации получаются нулевыми. """
+        return cls.from_permutation(cube.permutation())
+
+    def to_rubik(self) -> Rubik:
+        """ Перевести в Rubik (ориентации теряются). """
+        coloring = dict()
+        for c, s in enumerate(self.corner_slots + tuple(
+                s + 8 for s in self.edge_slots)):
+            coloring[Rubik.cells[s]] = Rubik.cells[c]
+        return Rubik(coloring)
+
+    @classmethod
+    def from_coloring(cls, coloring: dict, orientation: bool = False) \
+            -> CubieState:
+        """ Состояние по раскраске в формате example_rubik_state.py:
+        позиция (x, y, z) -> цвета кубика, например 'YOG'.
+
+        Порядок цветов в таких файлах не фиксирован, поэтому по умолчанию
+        читаются только положения кубиков. С orientation=True цвета
+        считаются записанными по ненулевым осям позиции в порядке x, y, z
+        (так пишет to_coloring), и ориентации проверяются на собираемость. """
+        corner_slots, corner_twist = [0] * 8, [0] * 8
+        edge_slots, edge_flip = [0] * 12, [0] * 12
+        index = {c: i for i, c in enumerate(Rubik.cells)}
+
+        for pos, colors in coloring.items():
+            slot_cell = Vector(*pos)
+            home = cell(colors)
+            s, c = index[slot_cell], index[home]
+            o = 0
+            if orientation:
+                normals = [Color.__members__[w].value for w in colors]
+                k = normals.index(stickers(home)[0])
+                o = stickers(slot_cell).index(_axes(slot_cell)[k])
+            if c < 8:
+                corner_slots[c], corner_twist[c] = s, o
+            else:
+                edge_slots[c - 8], edge_flip[c - 8] = s - 8, o
+
+        state = cls(corner_slots, corner_twist, edge_slots, edge_flip)
+        if orientation and (sum(corner_twist) % 3 or sum(edge_flip) % 2):
+            raise ValueError("Coloring has impossible orientation of cubies.")
+        return state
+
+    def to_coloring(self) -> dict[Tuple[int, int, int], str]:
+        """ Раскраска в формате example_rubik_state.py, цвета записаны по
+        ненулевым осям позиции в порядке x, y, z. """
+        names = {color.value: color.name for color in Color}
+        res = dict()
+        slots = self.corner_slots + tuple(s + 8 for s in self.edge_slots)
+        twists = self.corner_twist + self.edge_flip
+        for c, (s, o) in enumerate(zip(slots, twists)):
+            home, slot_cell = Rubik.cells[c], Rubik.cells[s]
+            home_stickers = stickers(home)
+            slot_stickers = stickers(slot_cell)
+            # Наклейка home_stickers[i] лежит на грани slot_stickers[i + o].
+            colors = []
+            for normal in _axes(slot_cell):
+                i = (slot_stickers.index(normal) - o) % len(slot_stickers)
+                colors.append(names[home_stickers[i]])
+            res[tuple(slot_cell)] = ''.join(colors)
+        return res
+
+    @classmethod
+    def load(cls, path: Path, orientation: bool = False) -> CubieState:
+        """ Загрузить состояние из файла в формате Rubik.load. """
+        coloring = dict()
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                x, y, z, colors = line.split()
+                coloring[(int(x), int(y), int(z))] = colors
+        return cls.from_coloring(coloring, orientation)
+
+    @classmethod
+    def from_involute(cls, rep: InvoluteRepresentation) -> CubieState:
+        """ Состояние по развертке InvoluteRepresentation. Развертка задает
+        каждую наклейку, поэтому ориентации восстанавливаются точно. """
+        index = {c: i for i, c in enumerate(Rubik.cells)}
+        corner_slots, corner_twist = [0] * 8, [0] * 8
+        edge_slots, edge_flip = [0] * 12, [0] * 12
+
+        for facelets in rep._vertex + rep._edges:
+            slot_cell = _facelets_cell(facelets)
+            homes = [rep.state[x] for x in facelets]
+            home = _facelets_cell(homes)
+            reference = stickers(home)[0]
+            k = [Color.__members__[h[0]].value for h in homes].index(reference)
+            normal = Color.__members__[facelets[k][0]].value
+            s, c = index[slot_cell], index[home]
+            o = stickers(slot_cell).index(normal)
+            if c < 8:
+                corner_slots[c], corner_twist[c] = s, o
+            else:
+                edge_slots[c - 8], edge_flip[c - 8] = s - 8, o
+
+        return cls(corner_slots, corner_twist, edge_slots, edge_flip)
+
+
+def _axes(cell_: Vector) -> List[Vector]:
+    """ Нормали граней позиции по ненулевым осям в порядке x, y, z. """
+    x, y, z = cell_
+    normals = [Vector(x, 0, 0), Vector(0, y, 0), Vector(0, 0, z)]
+    return [v for v in normals if v.rank() > 0]
+
+
+def _parity(seq: Sequence[int]) -> int:
+    """ Четность перестановки, заданной списком образов. """
+    return sum(1 for i, x in enumerate(seq) for y in seq[i + 1:] if y < x) % 2
+
+
+def _facelets_cell(facelets: Sequence[str]) -> Vector:
+    """ Позиция кубика по меткам его наклеек развертки ('B3', 'O9', ...). """
+    return cell(''.join(x[0] for x in facelets))
+
+
+_SOLVED = CubieState()._codes
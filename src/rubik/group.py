@@ -0,0 +1,353 @@
+from __future__ import annotations
+from itertools import product
+from math import prod
+from random import Random
+from typing import Hashable, Iterable, List, Optional, Union
+
+from rubik.permutation import DensePermutation, Permutation
+
+AnyPermutation = Union[Permutation, DensePermutation]
+
+
+class PermutationGroup:
+    """ Группа перестановок, заданная образующими.
+
+    При создании строится цепочка стабилизаторов (база и сильная порождающая
+    система) алгоритмом Шрайера-Симса в варианте Кнута. Цепочка позволяет за
+    полиномиальное время узнать порядок группы, проверить принадлежность
+    перестановки группе и выбрать равномерно случайный элемент.
+
+    Образующие могут быть словарными перестановками с произвольными метками
+    точек (например, развертка InvoluteRepresentation) или плотными
+    перестановками. Если все точки целые из 0..255, метки совпадают с
+    индексами, иначе точки нумеруются в порядке сортировки меток. """
+
+    def __init__(self, generators: Iterable[AnyPermutation]):
+        generators = list(generators)
+        self.domain = self._domain(generators)
+        self._index = {x: i for i, x in enumerate(self.domain)}
+        self.degree = len(self.domain)
+        self.identity = DensePermutation(range(self.degree))
+        self.generators = [self.to_dense(g) for g in generators]
+
+        # Уровень k цепочки: базовая точка, сильные образующие стабилизатора
+        # первых k базовых точек и трансверсаль орбиты базовой точки, в
+        # которой для точки j хранится элемент, переводящий базовую точку в j.
+        self._base: List[int] = []
+        self._strong: List[List[DensePermutation]] = []
+        self._transversal: List[dict[int, DensePermutation]] = []
+        self._transversal_inv: List[dict[int, DensePermutation]] = []
+
+        for g in self.generators:
+            self._add(0, g)
+
+    @staticmethod
+    def _domain(generators: List[AnyPermutation]) -> List[Hashable]:
+        points = set()
+        for g in generators:
+            if isinstance(g, DensePermutation):
+                points |= set(range(g.n))
+            else:
+                points |= set(g._perm)
+
+        if all(isinstance(x, int) and 0 <= x < 256 for x in points):
+            return list(range(max(points, default=-1) + 1))
+        if len(points) > 256:
+            raise ValueError("Group supports permutations of degree <= 256.")
+        return sorted(points, key=str)
+
+    def to_dense(self, p: AnyPermutation) -> DensePermutation:
+        """ Перевести перестановку на точках группы в плотную. """
+        if isinstance(p, DensePermutation):
+            if p.len() and max(x for c in p.cycles() for x in c) >= self.degree:
+                raise ValueError(f"Permutation {p} moves points out of domain.")
+            return DensePermutation._from_images(p._table[:self.degree])
+
+        images = bytearray(range(self.degree))
+        for key, val in p._perm.items():
+            if key not in self._index or val not in self._index:
+                raise ValueError(
+                    f"Permutation moves point {key} out of group domain.")
+            images[self._index[key]] = self._index[val]
+        return DensePermutation._from_images(bytes(images))
+
+    def to_permutation(self, p: DensePermutation) -> Permutation:
+        """ Перевести плотную перестановку в словарную на метках группы. """
+        domain = self.domain
+        return Permutation({domain[i]: domain[x]
+                            for i, x in enumerate(p._img) if i != x})
+
+    @property
+    def base(self) -> List[Hashable]:
+        """ База цепочки стабилизаторов. """
+        return [self.domain[b] for b in self._base]
+
+    @property
+    def strong_generators(self) -> List[Permutation]:
+        """ Сильная порождающая система. """
+        res = []
+        for gens in self._strong:
+            res += [self.to_permutation(g) for g in gens]
+        return res
+
+    def _sift(self, g: DensePermutation, level: int = 0) -> DensePermutation:
+        """ Просеять перестановку через цепочку начиная с уровня level.
+        Возвращает остаток, который тождественен для элементов группы. """
+        for k in range(level, len(self._base)):
+            j = g._img[self._base[k]]
+            u_inv = self._transversal_inv[k].get(j)
+            if u_inv is None:
+                return g
+            g = g * u_inv
+        return g
+
+    def _add(self, k: int, g: DensePermutation):
+        """ Добавить образующую g в стабилизатор уровня k (процедура A). """
+        if self._sift(g, k).len() == 0:
+            return
+
+        if k == len(self._base):
+            point = next(i for i, x in enumerate(g._img) if i != x)
+            self._base.append(point)
+            self._strong.append([])
+            self._transversal.append({point: self.identity})
+            self._transversal_inv.append({point: self.identity})
+
+        self._strong[k].append(g)
+        for u in list(self._transversal[k].values()):
+            self._extend(k, u * g)
+
+    def _extend(self, k: int, t: DensePermutation):
+        """ Дополнить орбиту уровня k элементом t (процедура B). Если образ
+        базовой точки уже в орбите, получается образующая Шрайера, которую
+        добавляем на следующий уровень. """
+        stack = [t]
+        while stack:
+            t = stack.pop()
+            j = t._img[self._base[k]]
+            u_inv = self._transversal_inv[k].get(j)
+            if u_inv is not None:
+                self._add(k + 1, t * u_inv)
+                continue
+
+            self._transversal[k][j] = t
+            self._transversal_inv[k][j] = t.inverse()
+            stack.extend(t * g for g in self._strong[k])
+
+    def order(self) -> int:
+        """ Порядок группы. """
+        return prod(len(t) for t in self._transversal)
+
+    def __contains__(self, p: AnyPermutation) -> bool:
+        try:
+            g = self.to_dense(p)
+        except ValueError:
+            return False
+        return self._sift(g).len() == 0
+
+    def contains(self, p: AnyPermutation) -> bool:
+        """ Проверить, что перестановка принадлежит группе. """
+        return p in self
+
+    def random_element(self, rng: Optional[Random] = None) -> Permutation:
+        """ Равномерно случайный элемент группы. """
+        return self.to_permutation(self.random_dense(rng))
+
+    def random_dense(self, rng: Optional[Random] = None) -> DensePermutation:
+        """ Равномерно случайный элемент группы в плотной записи. Каждый
+        элемент однозначно раскладывается в произведение u_m ... u_1
+        представителей трансверсалей, поэтому достаточно выбрать по одному
+        представителю на уровне. """
+        rng = rng or Random()
+        g = self.identity
+        for transversal in reversed(self._transversal):
+            g = g * rng.choice(list(transversal.values()))
+        return g
+
+
+class SiftSolver:
+    """ Конструктивный решатель на цепочке стабилизаторов.
+
+    Для каждого представителя трансверсали (элемента вектора Шрайера)
+    хранится слово в образующих, которое его записывает. Таблицы слов
+    заполняются по схеме Минквица: короткие слова просеиваются через цепочку,
+    и на каждом уровне запоминается самое короткое слово для точки орбиты.
+    Любая перестановка группы затем раскладывается просеиванием за
+    предсказуемое полиномиальное время, без лексики 3-циклов.
+
+    Если произведения представителей перестают давать новые точки, а
+    таблицы еще не полные (мало bfs_depth), орбиты достраиваются по
+    образующим Шрайера со словами (см. _close). """
+
+    def __init__(
+        self,
+        actions: dict[str, AnyPermutation],
+        group: Optional[PermutationGroup] = None,
+        bfs_depth: int = 4,
+        improve_rounds: int = 1,
+    ):
+        self.actions = dict(actions)
+        if any(len(key) != 1 for key in self.actions):
+            raise ValueError("Action names must be single letters.")
+        self.group = group or PermutationGroup(self.actions.values())
+        self._moves = {key: self.group.to_dense(p)
+                       for key, p in self.actions.items()}
+        self._orders = {key: p.deg() for key, p in self._moves.items()}
+
+        self._words: List[dict[int, str]] = \
+            [{b: ''} for b in self.group._base]
+        self._perms: List[dict[int, DensePermutation]] = \
+            [{b: self.group.identity} for b in self.group._base]
+        self._perms_inv: List[dict[int, DensePermutation]] = \
+            [{b: self.group.identity} for b in self.group._base]
+        self._sizes = [len(t) for t in self.group._transversal]
+
+        self._fill(bfs_depth, improve_rounds)
+
+    def _complete(self) -> bool:
+        return all(len(w) == n for w, n in zip(self._words, self._sizes))
+
+    def _filled(self) -> int:
+        return sum(len(w) for w in self._words)
+
+    def _inverse(self, ws: str) -> str:
+        """ Слово обратной перестановки: обратное к X записывается как X в
+        степени (порядок X) - 1. """
+        return ''.join(w * (self._orders[w] - 1) for w in reversed(ws))
+
+    def _reduce(self, ws: str) -> str:
+        """ Сократить серии одинаковых букв по модулю порядка буквы. """
+        stack: List[List] = []
+        for w in ws:
+            if stack and stack[-1][0] == w:
+                stack[-1][1] += 1
+            else:
+                stack.append([w, 1])
+            if stack[-1][1] == self._orders[w]:
+                stack.pop()
+        return ''.join(w * k for w, k in stack)
+
+    def _insert(self, t: DensePermutation, ws: str, level: int = 0):
+        """ Просеять элемент t со словом ws, запоминая на каждом уровне более
+        короткие слова. """
+        base = self.group._base
+        for k in range(level, len(base)):
+            if t.len() == 0:
+                return
+            j = t._img[base[k]]
+            known = self._words[k].get(j)
+            if known is None or len(ws) < len(known):
+                # Новое слово короче. Старый представитель (если был)
+                # просеивается дальше вместо нового.
+                self._words[k][j] = ws
+                old = self._perms[k].get(j)
+                self._perms[k][j] = t
+                self._perms_inv[k][j] = t.inverse()
+                if old is None:
+                    return
+                t, ws = old * self._perms_inv[k][j], \
+                    self._reduce(known + self._inverse(ws))
+                continue
+
+            t = t * self._perms_inv[k][j]
+            ws = self._reduce(ws + self._inverse(known))
+
+    def _improve(self):
+        """ Просеять произведения представителей одного уровня. """
+        for k in range(len(self._words)):
+            entries = list(zip(self._perms[k].values(),
+                               self._words[k].values()))
+            for (a, wa), (b, wb) in product(entries, entries):
+                if len(wa) and len(wb):
+                    self._insert(a * b, self._reduce(wa + wb), k)
+
+    def _close(self):
+        """ Достроить таблицы алгоритмом Шрайера-Симса со словами.
+
+        На уровне k орбита базовой точки замыкается по образующим
+        стабилизатора G_k (на нулевом уровне это действия). Затем
+        произведения представителей с образующими, поделенные на
+        представителя образа базовой точки, дают образующие Шрайера для
+        G_(k+1). Из них оставляются только те, что расширяют уже набранную
+        подгруппу, пока ее порядок не сравняется с порядком G_(k+1). """
+        base = self.group._base
+        last = max(k for k, (w, n) in enumerate(zip(self._words, self._sizes))
+                   if len(w) < n)
+        gens = [(self._moves[key], key) for key in self._moves]
+        for k in range(last + 1):
+            queue = list(zip(self._perms[k].values(),
+                             self._words[k].values()))
+            while queue:
+                u, wu = queue.pop()
+                for g, wg in gens:
+                    t = u * g
+                    if t._img[base[k]] not in self._words[k]:
+                        ws = self._reduce(wu + wg)
+                        self._insert(t, ws, k)
+                        queue.append((t, ws))
+
+            if k == last:
+                break
+            target = prod(self._sizes[k + 1:])
+            subgroup = PermutationGroup([self.group.identity])
+            next_gens = []
+            entries = list(zip(self._perms[k].values(),
+                               self._words[k].values()))
+            for (u, wu), (g, wg) in product(entries, gens):
+                if subgroup.order() == target:
+                    break
+                t = u * g
+                j = t._img[base[k]]
+                s = t * self._perms_inv[k][j]
+                if subgroup._sift(s).len() == 0:
+                    continue
+                subgroup._add(0, s)
+                next_gens.append((s, self._reduce(
+                    wu + wg + self._inverse(self._words[k][j]))))
+            gens = next_gens
+
+    def _fill(self, bfs_depth: int, improve_rounds: int):
+        """ Просеять все несократимые слова длины до bfs_depth, затем
+        комбинировать представители, пока таблицы не станут полными, и еще
+        improve_rounds раз для укорачивания слов. Если комбинирование не
+        добавило ни одной точки, таблицы достраиваются через _close. """
+        letters = list(self._moves)
+        for n in range(1, bfs_depth + 1):
+            for arr in product(letters, repeat=n):
+                ws = ''.join(arr)
+                if self._reduce(ws) != ws:
+                    continue
+                self._insert(self._dense(ws), ws)
+
+        while not self._complete():
+            filled = self._filled()
+            self._improve()
+            if self._filled() == filled:
+                self._close()
+
+        for _ in range(improve_rounds):
+            self._improve()
+
+    def _dense(self, ws: str) -> DensePermutation:
+        p = self.group.identity
+        for w in ws:
+            p = p * self._moves[w]
+        return p
+
+    def word(self, p: AnyPermutation) -> str:
+        """ Слово в образующих, задающее перестановку p. """
+        g = self.group.to_dense(p)
+        base = self.group._base
+        words = []
+        for k in range(len(base)):
+            j = g._img[base[k]]
+            ws = self._words[k].get(j)
+            if ws is None:
+                raise ValueError(f"Permutation {p} doesn't belong to group.")
+            g = g * self._perms_inv[k][j]
+            words.append(ws)
+
+        if g.len() != 0:
+            raise ValueError(f"Permutation {p} doesn't belong to group.")
+
+        return self._reduce(''.join(reversed(words)))
@@ -0,0 +1,384 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Generator, List, Optional, Tuple, Union
+
+from rubik.words import AXIS, DENSE_ACT, Cycle3Lexica, dense_word
+from rubik.words import inverse_word, normalize_word
+
+Triplet = Tuple[int, int, int]
+
+# Заголовок файла: сигнатура, версия формата, число точек n, число слов,
+# размер блока слов и sha256 от индекса и блока слов.
+HEADER = struct.Struct('<8sHHII32s')
+MAGIC = b'RBLEXICA'
+VERSION = 1
+
+# Запись индекса: смещение слова в блоке и его длина (0 - слова нет).
+ENTRY = struct.Struct('<IH')
+
+SUFFIX = '.bin'
+
+# Каталог лексик репозитория, не зависит от текущего каталога процесса.
+LEXICA_DIR = Path(__file__).resolve().parents[2] / 'lexica'
+DEFAULT_LEXICA = '3dim_full'
+
+
+def lexica_dir() -> Path:
+    """ Каталог лексик, задается переменной RUBIK_LEXICA. По умолчанию
+    каталог lexica репозитория: вне исходников переменную нужно задать. """
+    return Path(os.environ.get('RUBIK_LEXICA', LEXICA_DIR))
+
+
+def _key(tr: Triplet, n: int) -> int:
+    a, b, c = Cycle3Lexica._standart_triplet(tr)
+    return (a * n + b) * n + c
+
+
+def compile_lexica(lexica: Cycle3Lexica, path: Path) -> str:
+    """ Записать лексику в бинарный файл и вернуть хеш содержимого.
+
+    После заголовка идет индекс фиксированного размера: по записи на каждую
+    тройку точек (a, b, c) из 0..n-1 в порядке номера (a * n + b) * n + c,
+    затем слова подряд. Поиск слова по триплету - одно чтение записи
+    индекса. Запись атомарная, через временный файл. """
+    n = max((max(tr) for tr in lexica.vocab), default=-1) + 1
+    index = bytearray(ENTRY.size * n ** 3)
+    blob = bytearray()
+    for tr, ws in lexica.vocab.items():
+        ENTRY.pack_into(index, ENTRY.size * _key(tr, n), len(blob), len(ws))
+        blob += ws.encode()
+
+    digest = hashlib.sha256(index + blob).digest()
+    header = HEADER.pack(MAGIC, VERSION, n, len(lexica.vocab), len(blob),
+                         digest)
+
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        f.write(index)
+        f.write(blob)
+    os.replace(tmp, path)
+    return digest.hex()
+
+
+def compile_text(source: Path, target: Optional[Path] = None) -> Path:
+    """ Перевести текстовую лексику (слово в строке) в бинарный файл. По
+    умолчанию файл кладется рядом с исходным с суффиксом .bin. """
+    source = Path(source)
+    target = Path(target) if target else \
+        source.with_name(source.name + SUFFIX)
+    compile_lexica(Cycle3Lexica.load(source), target)
+    return target
+
+
+class CompiledLexica:
+    """ Лексика из бинарного файла compile_lexica.
+
+    Файл отображается в память, при открытии читается только заголовок,
+    поэтому загрузка не зависит от размера лексики. Слова не перепроверяются:
+    они проверены при компиляции, а целостность файла можно проверить по
+    хешу методом verify. Интерфейс чтения тот же, что у Cycle3Lexica. """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"File {path} isn't compiled lexica.")
+        magic, version, n, count, blob_size, digest = \
+            HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"File {path} isn't compiled lexica.")
+        if version != VERSION:
+            raise ValueError(f"Lexica {path} has unsupported version "
+                             f"{version}.")
+
+        self.n = n
+        self._count = count
+        self._index = HEADER.size
+        self._blob = HEADER.size + ENTRY.size * n ** 3
+        if len(self._mm) != self._blob + blob_size:
+            raise ValueError(f"Lexica {path} has wrong size.")
+        self.digest = digest.hex()
+
+    @classmethod
+    def load(cls, path: Path) -> CompiledLexica:
+        return cls(path)
+
+    def get(self, tr: Triplet) -> Optional[str]:
+        if any(not 0 <= x < self.n for x in tr):
+            return None
+        offset, length = ENTRY.unpack_from(
+            self._mm, self._index + ENTRY.size * _key(tr, self.n))
+        if length == 0:
+            return None
+        start = self._blob + offset
+        return self._mm[start:start + length].decode()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, tr: Triplet) -> bool:
+        return self.get(tr) is not None
+
+    def items(self) -> Generator[Tuple[Triplet, str], None, None]:
+        """ Пары (триплет, слово) в порядке номеров триплетов. """
+        n = self.n
+        for key in range(n ** 3):
+            offset, length = ENTRY.unpack_from(
+                self._mm, self._index + ENTRY.size * key)
+            if length == 0:
+                continue
+            ab, c = divmod(key, n)
+            a, b = divmod(ab, n)
+            start = self._blob + offset
+            yield (a, b, c), self._mm[start:start + length].decode()
+
+    @property
+    def vocab(self) -> dict[Triplet, str]:
+        return dict(self.items())
+
+    def verify(self) -> bool:
+        """ Сверить хеш индекса и слов с заголовком. """
+        digest = hashlib.sha256(self._mm[HEADER.size:]).hexdigest()
+        return digest == self.digest
+
+    def to_lexica(self) -> Cycle3Lexica:
+        """ Изменяемая копия в виде Cycle3Lexica (без перепроверки слов). """
+        lexica = Cycle3Lexica()
+        lexica.vocab = self.vocab
+        return lexica
+
+    def close(self):
+        self._mm.close()
+
+
+class CandidateLexica:
+    """ Лексика с несколькими словами на триплет: для каждого триплета
+    хранятся до top_k самых коротких различных слов.
+
+    Кроме слов исходной лексики сюда попадают их варианты. Циклический
+    сдвиг слова w = u v в v u задает сопряженную перестановку
+    P(u)^-1 P(w) P(u), то есть 3-цикл на других точках той же длины, а
+    обращенное слово задает обратный 3-цикл. Все варианты приводятся
+    normalize_word. Из нескольких слов решатель выбирает те, что лучше
+    сокращаются с соседями (см. rubik.solver.assemble_word). """
+
+    def __init__(self, top_k: int = 4):
+        self.top_k = top_k
+        self.words: dict[Triplet, List[str]] = dict()
+
+    def add(self, ws: str, tr: Optional[Triplet] = None):
+        """ Добавить слово. Если триплет не задан, он вычисляется. """
+        if tr is None:
+            cycles = dense_word(ws).cycles()
+            if len(cycles) != 1 or len(cycles[0]) != 3:
+                raise ValueError(f"Word {ws} isn't a 3-cycle.")
+            tr = tuple(cycles[0])
+        tr = Cycle3Lexica._standart_triplet(tr)
+
+        words = self.words.setdefault(tr, [])
+        if ws in words:
+            return
+        # Сортировка устойчивая: при равной длине остается порядок
+        # добавления, так что исходные слова лексики идут первыми.
+        words.append(ws)
+        words.sort(key=len)
+        del words[self.top_k:]
+
+    @classmethod
+    def from_lexica(cls, lexica: AnyLexica, top_k: int = 4,
+                    variants: bool = True) -> CandidateLexica:
+        """ Собрать из обычной лексики, добавив сдвиги и обращения слов. """
+        res = cls(top_k)
+        items = list(lexica.vocab.items())
+        for tr, ws in items:
+            res.add(normalize_word(ws), tr)
+        if not variants:
+            return res
+
+        for (a, b, c), ws in items:
+            base = normalize_word(ws)
+            inv = normalize_word(inverse_word(ws))
+            res.add(inv, (a, c, b))
+            for w, (x, y, z) in ((base, (a, b, c)), (inv, (a, c, b))):
+                # Сдвиг на префикс u переводит 3-цикл (x y z) в
+                # (U(x) U(y) U(z)), где U - перестановка u.
+                seam = AXIS[w[-1]][0] == AXIS[w[0]][0]
+                prefix = DENSE_ACT[w[0]]
+                for i in range(1, len(w)):
+                    img = prefix._img
+                    rotated = w[i:] + w[:i]
+                    # Слово w каноническое, поэтому сокращения возможны
+                    # только на стыке концов или на месте разреза блока.
+                    if seam or AXIS[w[i - 1]][0] == AXIS[w[i]][0]:
+                        rotated = normalize_word(rotated)
+                    res.add(rotated, (img[x], img[y], img[z]))
+                    prefix = prefix * DENSE_ACT[w[i]]
+        return res
+
+    def candidates(self, tr: Triplet) -> List[str]:
+        """ Слова для триплета от коротких к длинным. """
+        return self.words.get(Cycle3Lexica._standart_triplet(tr), [])
+
+    def get(self, tr: Triplet) -> Optional[str]:
+        words = self.candidates(tr)
+        return words[0] if words else None
+
+    @property
+    def vocab(self) -> dict[Triplet, str]:
+        return {tr: words[0] for tr, words in self.words.items()}
+
+
+AnyLexica = Union[Cycle3Lexica, CompiledLexica, CandidateLexica]
+
+
+class LexicaRegistry:
+    """ Кеш загруженных лексик, общий для процесса.
+
+    Лексика задается именем файла в каталоге directory (по умолчанию
+    lexica_dir() на момент обращения) или путем. Загрузка
+    ленивая: файл читается при первом обращении, дальше используется тот
+    же загруженный объект. Ключ кеша - путь, время изменения и sha256 файла: если время
+    изменения поменялось, файл хешируется заново и перечитывается только при
+    другом содержимом. Бинарные файлы (compile_lexica) открываются через
+    CompiledLexica, текстовые через Cycle3Lexica.load. При перечитывании
+    файла и в clear реестр только забывает старую версию CompiledLexica:
+    compile_lexica подменяет файл через os.replace, поэтому у тех, кто ее
+    уже получил, она продолжает работать, а отображение закрывается при
+    сборке мусора. Обращения из разных потоков защищены блокировкой. """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self._directory = None if directory is None else Path(directory)
+        self._lock = threading.Lock()
+        # Путь -> (время изменения, хеш, лексика).
+        self._cache: dict[Path, Tuple[int, str, AnyLexica]] = dict()
+        # (путь, хеш, top_k) -> лексика с вариантами.
+        self._candidates: dict[Tuple[Path, str, int], CandidateLexica] = \
+            dict()
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is not None:
+            return self._directory
+        return lexica_dir()
+
+    def resolve(self, name: Union[str, Path]) -> Path:
+        """ Путь к лексике: существующий путь как есть, иначе имя файла в
+        каталоге лексик. """
+        path = Path(name)
+        if not path.is_absolute() and not path.exists():
+            path = self.directory / path
+        if not path.exists():
+            raise FileNotFoundError(f"Lexica {name} not found.")
+        return path.resolve()
+
+    def _load(self, path: Path) -> Tuple[str, AnyLexica]:
+        """ Хеш и общий экземпляр лексики по пути, при необходимости
+        перечитать файл. Вызывается под блокировкой. """
+        mtime = path.stat().st_mtime_ns
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if cached is not None and cached[1] == digest:
+            self._cache[path] = (mtime, digest, cached[2])
+            return digest, cached[2]
+
+        if data.startswith(MAGIC):
+            lexica = CompiledLexica(path)
+        else:
+            lexica = Cycle3Lexica.load(path)
+        self._cache[path] = (mtime, digest, lexica)
+        return digest, lexica
+
+    def get(self, name: Union[str, Path] = DEFAULT_LEXICA) -> AnyLexica:
+        """ Лексика name. CompiledLexica только для чтения и отдается общим
+        экземпляром, Cycle3Lexica - копией, чтобы изменения одного
+        вызывающего не попадали к остальным. """
+        path = self.resolve(name)
+        with self._lock:
+            _, lexica = self._load(path)
+        if isinstance(lexica, Cycle3Lexica):
+            return lexica.copy()
+        return lexica
+
+    def candidates(self, name: Union[str, Path] = DEFAULT_LEXICA,
+                   top_k: int = 4) -> CandidateLexica:
+        """ Лексика с вариантами слов (CandidateLexica) поверх лексики
+        name. Строится один раз для каждой версии файла (по sha256), при
+        смене версии варианты старой удаляются из кеша. """
+        path = self.resolve(name)
+        with self._lock:
+            digest, lexica = self._load(path)
+            key = (path, digest, top_k)
+            cached = self._candidates.get(key)
+            if cached is not None:
+                return cached
+
+        candidates = CandidateLexica.from_lexica(lexica, top_k)
+        with self._lock:
+            for old in [k for k in self._candidates
+                        if k[0] == path and k[1] != digest]:
+                del self._candidates[old]
+            self._candidates[key] = candidates
+        return candidates
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._candidates.clear()
+
+
+REGISTRY = LexicaRegistry()
+
+
+def get_lexica(name: Union[str, Path] = DEFAULT_LEXICA) -> AnyLexica:
+    """ Лексика из общего реестра процесса (Cycle3Lexica - копией). """
+    return REGISTRY.get(name)
+
+
+def get_candidate_lexica(name: Union[str, Path] = DEFAULT_LEXICA,
+                         top_k: int = 4) -> CandidateLexica:
+    """ Лексика с вариантами слов из общего реестра процесса. """
+    return REGISTRY.candidates(name, top_k)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m rubik.lexica',
+        description="Инструменты для файлов лексики.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser(
+        'compile', help="Скомпилировать текстовые лексики в бинарный формат.")
+    compile_parser.add_argument('sources', nargs='+', type=Path)
+    compile_parser.add_argument(
+        '-o', '--output', type=Path, default=None,
+        help="Каталог для бинарных файлов (по умолчанию рядом с исходными).")
+    args = parser.parse_args(argv)
+
+    for source in args.sources:
+        target = None
+        if args.output is not None:
+            args.output.mkdir(parents=True, exist_ok=True)
+            target = args.output / (source.name + SUFFIX)
+        target = compile_text(source, target)
+        lexica = CompiledLexica(target)
+        print(f"{source} -> {target}: {len(lexica)} words, "
+              f"sha256 {lexica.digest}")
+        lexica.close()
+
+
+if __name__ == '__main__':
+    main()
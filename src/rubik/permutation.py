@@ -1,5 +1,10 @@
+from __future__ import annotations
 from math import lcm
-from typing import List, Optional, Union
+from operator import ne
+from typing import Hashable, Iterable, List, Optional, Sequence, Union
+from weakref import WeakValueDictionary
+
+from rubik.coordinates import lehmer_rank, lehmer_unrank
 
 PermDictType = Union[dict[int, int], dict[str, str]]
 
@@ -95,23 +100,17 @@ class Permutation:
         return Permutation(perm_dict)
 
     def __pow__(self, k: int):
-        if k == 0:
-            return Permutation()
-
-        if k < 0:
-            perm = self.inverse()
-        else:
-            perm = Permutation(self._perm)
+        """ Степень перестановки. Каждый цикл длины n поворачивается на
+        k mod n позиций за один проход, без повторных умножений. """
+        perm = dict()
+        for cycle in self.cycles():
+            r = k % len(cycle)
+            if r == 0:
+                continue
+            for x, y in zip(cycle, cycle[r:] + cycle[:r]):
+                perm[x] = y
 
-        cum = Permutation()
-        k = abs(k)
-        while k > 0:
-            k, e = divmod(k, 2)
-            if e == 1:
-                cum *= perm
-            perm *= perm
-
-        return cum
+        return Permutation(perm)
 
     def __truediv__(self, perm):
         return self * perm.inverse()
@@ -142,8 +141,272 @@ class Permutation:
                 return False
         return True
 
+    def __hash__(self) -> int:
+        return hash(frozenset(self._perm.items()))
+
+    def rank(self, points: Sequence[Hashable]) -> int:
+        """ Номер перестановки (код Лемера) на упорядоченном наборе точек.
+        Перестановка не должна выводить точки за пределы набора. """
+        index = {x: i for i, x in enumerate(points)}
+        try:
+            return lehmer_rank([index[self.apply(x)] for x in points])
+        except KeyError:
+            raise ValueError(f"Permutation {self} moves points out of set.")
+
+    @classmethod
+    def unrank(cls, rank: int, points: Sequence[Hashable]) -> Permutation:
+        """ Перестановка на упорядоченном наборе точек по ее номеру. """
+        seq = lehmer_unrank(rank, len(points))
+        return cls({x: points[i] for x, i in zip(points, seq)})
+
     def deg(self) -> int:
         """ Степень перестановки. Минимальная степень в которой перестановка
         будет равна единице."""
         cycles_deg = [len(c) for c in self.cycles()]
         return lcm(*cycles_deg)
+
+
+_IDENTITY = bytes(range(256))
+
+
+class DensePermutation:
+    """ Перестановка на фиксированном отрезке точек 0..n-1 (n <= 256).
+
+    Перестановка хранится таблицей образов bytes: элемент i переходит в
+    img[i], точки за пределами отрезка остаются на месте. Дополнительно
+    хранится та же таблица, дополненная до 256 байт, чтобы композиция сводилась
+    к одному вызову bytes.translate (сбор по индексам). Порядок умножения тот
+    же, что у Permutation: в произведении p * q сперва действует p, затем q.
+
+    Объект неизменяемый и хешируемый: хеш берется от таблицы bytes, который
+    python вычисляет один раз и хранит в самом объекте bytes. Метод intern
+    возвращает единственный экземпляр для каждой перестановки, так что для
+    интернированных перестановок сравнение сводится к проверке `is`.
+
+    Циклы, степень, знак, носитель и цикловой тип вычисляются при первом
+    обращении и запоминаются в объекте. """
+
+    __slots__ = ('_img', '_table', 'n', '__weakref__',
+                 '_cycles', '_support', '_order', '_type')
+
+    _interned: WeakValueDictionary[bytes, DensePermutation] = \
+        WeakValueDictionary()
+
+    def __init__(self, images: Optional[Iterable[int]] = None):
+        images = bytes(images) if images is not None else b''
+        if sorted(images) != list(range(len(images))):
+            raise ValueError("Image table isn't permutation.")
+        _set = object.__setattr__
+        _set(self, '_img', images)
+        _set(self, '_table', images + _IDENTITY[len(images):])
+        _set(self, 'n', len(images))
+
+    @classmethod
+    def _from_images(cls, images: bytes) -> DensePermutation:
+        """ Создать перестановку из готовой таблицы образов без проверок. """
+        perm = cls.__new__(cls)
+        _set = object.__setattr__
+        _set(perm, '_img', images)
+        _set(perm, '_table', images + _IDENTITY[len(images):])
+        _set(perm, 'n', len(images))
+        return perm
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DensePermutation is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError("DensePermutation is immutable.")
+
+    def __reduce__(self):
+        return DensePermutation, (self._img,)
+
+    def rank(self) -> int:
+        """ Номер перестановки точек 0..n-1 (код Лемера). """
+        return lehmer_rank(self._img)
+
+    @classmethod
+    def unrank(cls, rank: int, n: int) -> DensePermutation:
+        """ Перестановка точек 0..n-1 по ее номеру. """
+        return cls._from_images(bytes(lehmer_unrank(rank, n)))
+
+    def intern(self) -> DensePermutation:
+        """ Вернуть общий экземпляр равной перестановки той же степени из
+        таблицы интернирования. Ключ - таблица образов без дополнения, так
+        что тождественные перестановки разных степеней не смешиваются.
+        Таблица держит слабые ссылки и не мешает сборке мусора. """
+        return self._interned.setdefault(self._img, self)
+
+    @classmethod
+    def from_permutation(cls, perm: Permutation,
+                         n: Optional[int] = None) -> DensePermutation:
+        """ Перевести словарную перестановку на целых точках в плотную. """
+        moved = perm._perm
+        if n is None:
+            n = max(moved, default=-1) + 1
+        images = bytearray(_IDENTITY[:n])
+        for key, val in moved.items():
+            images[key] = val
+        return cls._from_images(bytes(images))
+
+    def to_permutation(self) -> Permutation:
+        """ Перевести в словарную перестановку. """
+        img = self._img
+        return Permutation({i: x for i, x in enumerate(img) if x != i})
+
+    def apply(self, k: int) -> int:
+        """ Показать куда перейдет элемент k под действием перестановки. """
+        if 0 <= k < 256:
+            return self._table[k]
+        return k
+
+    def __mul__(self, perm: DensePermutation) -> DensePermutation:
+        img = self._img if self.n >= perm.n else self._table[:perm.n]
+        return DensePermutation._from_images(img.translate(perm._table))
+
+    def __truediv__(self, perm: DensePermutation) -> DensePermutation:
+        return self * perm.inverse()
+
+    def apply_cycle(self, *cycles) -> DensePermutation:
+        """ Применить (справа) цикл к пермутации. """
+        n = max([self.n] + [max(cycle) + 1 for cycle in cycles])
+        images = _IDENTITY[:n]
+        for cycle in cycles:
+            step = bytearray(_IDENTITY)
+            for a, b in zip(cycle, cycle[1:]):
+                step[a] = b
+            step[cycle[-1]] = cycle[0]
+            images = images.translate(step)
+        return self * DensePermutation._from_images(images)
+
+    def inverse(self) -> DensePermutation:
+        """ Создать обратную пермутацию. """
+        images = bytearray(self.n)
+        for i, x in enumerate(self._img):
+            images[x] = i
+        return DensePermutation._from_images(bytes(images))
+
+    def __pow__(self, k: int) -> DensePermutation:
+        """ Степень перестановки. Если циклы уже известны (или степень
+        большая), каждый цикл поворачивается на k mod n позиций за один проход.
+        Для свежей перестановки и |k| <= 2 дешевле одно-два умножения, чем
+        разложение на циклы. """
+        try:
+            cycles = self._cycles
+        except AttributeError:
+            if abs(k) <= 2:
+                return self._pow_by_squaring(k)
+            cycles = self._cycle_tuple()
+
+        images = bytearray(_IDENTITY[:self.n])
+        for cycle in cycles:
+            r = k % len(cycle)
+            if r == 0:
+                continue
+            for x, y in zip(cycle, cycle[r:] + cycle[:r]):
+                images[x] = y
+        return DensePermutation._from_images(bytes(images))
+
+    def _pow_by_squaring(self, k: int) -> DensePermutation:
+        perm = self.inverse() if k < 0 else self
+        images = _IDENTITY[:self.n]
+        k = abs(k)
+        while k > 0:
+            k, e = divmod(k, 2)
+            if e == 1:
+                images = images.translate(perm._table)
+            if k > 0:
+                perm *= perm
+        return DensePermutation._from_images(images)
+
+    def _cycle_tuple(self) -> tuple[tuple[int, ...], ...]:
+        """ Циклы перестановки, вычисляются один раз и кешируются. """
+        try:
+            return self._cycles
+        except AttributeError:
+            pass
+
+        img = self._img
+        seen = bytearray(self.n)
+        answer = []
+        for head in range(self.n):
+            if seen[head] or img[head] == head:
+                continue
+            cycle = [head]
+            seen[head] = 1
+            k = img[head]
+            while k != head:
+                cycle.append(k)
+                seen[k] = 1
+                k = img[k]
+            answer.append(tuple(cycle))
+
+        cycles = tuple(answer)
+        object.__setattr__(self, '_cycles', cycles)
+        return cycles
+
+    def cycles(self) -> List[List[int]]:
+        """ Циклы перестановки. """
+        return [list(c) for c in self._cycle_tuple()]
+
+    def len(self) -> int:
+        "Количество элементов которые затрагивает перестановка."
+        try:
+            return self._support
+        except AttributeError:
+            support = sum(map(ne, self._img, range(self.n)))
+            object.__setattr__(self, '_support', support)
+            return support
+
+    def swaps(self):
+        """ Представить пермутацию в виде произведения перестановок. """
+        res = []
+        for cycle in self._cycle_tuple():
+            h = cycle[0]
+            for x in cycle[1:]:
+                res.append(tuple(sorted((h, x))))
+        return res
+
+    def deg(self) -> int:
+        """ Степень перестановки. Минимальная степень в которой перестановка
+        будет равна единице."""
+        try:
+            return self._order
+        except AttributeError:
+            order = lcm(*self.cycle_type())
+            object.__setattr__(self, '_order', order)
+            return order
+
+    def sign(self) -> int:
+        """ Знак перестановки: 1 для четной, -1 для нечетной. """
+        transpositions = sum(self.cycle_type()) - len(self.cycle_type())
+        return -1 if transpositions % 2 else 1
+
+    def cycle_type(self) -> tuple[int, ...]:
+        """ Длины нетривиальных циклов по убыванию. Одинаковый тип имеют
+        сопряженные перестановки. """
+        try:
+            return self._type
+        except AttributeError:
+            lengths = tuple(sorted(map(len, self._cycle_tuple()), reverse=True))
+            object.__setattr__(self, '_type', lengths)
+            return lengths
+
+    def __eq__(self, p) -> bool:
+        if self is p:
+            return True
+        if not isinstance(p, DensePermutation):
+            return NotImplemented
+        return self._table == p._table
+
+    def __hash__(self) -> int:
+        return hash(self._table)
+
+    def __repr__(self):
+        cycles = self._cycle_tuple()
+        if len(cycles) == 0:
+            return '( )'
+
+        def one_cycle(arr):
+            return '(' + ' '.join([str(x) for x in arr]) + ')'
+
+        return ' '.join([one_cycle(arr) for arr in cycles])
@@ -240,17 +240,17 @@ class InvoluteRepresentation(Representation):
         return coloring
 
     @classmethod
-    def load(cls, path: Path):
-        """ Прочитать раскраску из файла. """
+    def loads(cls, text: str):
+        """ Прочитать раскраску из строки в формате файла load. """
 
-        with open(path, 'r') as f:
-            lines = [line.replace('\n', '') for line in f if line != '\n']
-            lines = lines[1:]
+        lines = [line.replace(' ', '') for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        lines = lines[1:]
 
         pre_coloring = {}
-        assert len(lines) == 18, f"Some problem with amount of lines in {path}."
+        assert len(lines) == 18, "Some problem with amount of lines."
         for coord, color in zip(cls.standart_coloring(), lines):
-            assert len(coord) == len(color), f"There is mistake line in {path}."
+            assert len(coord) == len(color), f"There is mistake line {color}."
             for x, y in zip(coord, color):
                 pre_coloring[x] = y
 
@@ -258,6 +258,13 @@ class InvoluteRepresentation(Representation):
         self.state = cls._set_color_index(pre_coloring)
         return self
 
+    @classmethod
+    def load(cls, path: Path):
+        """ Прочитать раскраску из файла. """
+
+        with open(path, 'r') as f:
+            return cls.loads(f.read())
+
     def permutation(self, full=True) -> Permutation:
         if not full:
             return self._vertex_permutation()
@@ -0,0 +1,379 @@
+from __future__ import annotations
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Generator, Iterator, List, Optional, Sequence, Tuple
+
+from rubik.cubie import CORNER_SUBSETS, EDGE_SUBSETS, CubieState
+from rubik.permutation import DensePermutation
+from rubik.tables import MOVE_INDEX, move_table, pattern_table
+from rubik.words import DENSE_ACT, LETTERS, Cycle3Lexica, allowed_next
+from rubik.words import normalize_word
+
+
+class _Layer:
+    """ Слой фронта поиска в ширину: пары (слово, образы перестановки), все
+    слова слоя одной длины. Пока слой небольшой, он хранится списком, после
+    threshold записей сбрасывается в файл в каталоге spill_dir записями
+    фиксированной длины: образы и буквы слова. """
+
+    def __init__(self, depth: int, n: int, spill_dir: Optional[Path] = None,
+                 threshold: int = 1 << 20):
+        self.depth = depth
+        self.n = n
+        self.spill_dir = spill_dir
+        self.threshold = threshold
+        self._items: List[Tuple[str, bytes]] = []
+        self._file = None
+        self._size = 0
+
+    def append(self, ws: str, images: bytes):
+        self._size += 1
+        if self._file is not None:
+            self._file.write(images + ws.encode())
+            return
+
+        self._items.append((ws, images))
+        if self.spill_dir is not None and len(self._items) >= self.threshold:
+            self._spill()
+
+    def _spill(self):
+        self._file = tempfile.NamedTemporaryFile(
+            dir=self.spill_dir, prefix=f'layer_{self.depth}_', suffix='.bin',
+            delete=False)
+        for ws, images in self._items:
+            self._file.write(images + ws.encode())
+        self._items = []
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        if self._file is None:
+            yield from self._items
+            return
+
+        self._file.flush()
+        size = self.n + self.depth
+        with open(self._file.name, 'rb') as f:
+            while True:
+                chunk = f.read(size * 4096)
+                if not chunk:
+                    break
+                for i in range(0, len(chunk), size):
+                    record = chunk[i:i + size]
+                    yield record[self.n:].decode(), record[:self.n]
+
+    def close(self):
+        """ Удалить файл слоя. """
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self._file.name)
+            self._file = None
+        self._items = []
+
+
+class BreadthFirstSearch:
+    """ Поиск в ширину по графу Кэли группы кубика с образующими actions.
+
+    Каждая перестановка посещается один раз, поэтому первое найденное для
+    нее слово самое короткое. Посещенные перестановки хранятся множеством
+    строк образов (DensePermutation._img). Размер множества ограничивается
+    max_states: при достижении предела поиск останавливается и выставляет
+    флаг truncated. Слои фронта больше spill_threshold записей сбрасываются
+    на диск в spill_dir, в памяти остается только множество посещенных. """
+
+    def __init__(
+        self,
+        actions: Optional[dict[str, DensePermutation]] = None,
+        max_states: Optional[int] = None,
+        spill_dir: Optional[Path] = None,
+        spill_threshold: int = 1 << 20,
+    ):
+        self.actions = dict(actions or DENSE_ACT)
+        self.n = max(p.n for p in self.actions.values())
+        self.max_states = max_states
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self.truncated = False
+
+    def search(self, max_depth: int) -> \
+            Generator[Tuple[str, DensePermutation], None, None]:
+        """ Перебрать все перестановки, достижимые словами длины не больше
+        max_depth, в порядке возрастания длины кратчайшего слова. Возвращает
+        пары (кратчайшее слово, перестановка), тождественная не выдается. """
+        moves = [(w, p._table) for w, p in self.actions.items()]
+        identity = bytes(range(self.n))
+        visited = {identity}
+        self.truncated = False
+
+        layer = _Layer(0, self.n, self.spill_dir, self.spill_threshold)
+        layer.append('', identity)
+        new_layer = layer
+        try:
+            for depth in range(1, max_depth + 1):
+                new_layer = _Layer(depth, self.n, self.spill_dir,
+                                   self.spill_threshold)
+                for ws, images in layer:
+                    for w, table in moves:
+                        img = images.translate(table)
+                        if img in visited:
+                            continue
+                        if self.max_states is not None and \
+                                len(visited) >= self.max_states:
+                            self.truncated = True
+                            return
+                        visited.add(img)
+                        new_layer.append(ws + w, img)
+                        yield ws + w, DensePermutation._from_images(img)
+                layer.close()
+                layer = new_layer
+                if len(layer) == 0:
+                    return
+        finally:
+            layer.close()
+            new_layer.close()
+
+
+def shortest_triplet_words(
+    max_depth: int,
+    max_states: Optional[int] = None,
+    spill_dir: Optional[Path] = None,
+    actions: Optional[dict[str, DensePermutation]] = None,
+) -> dict[Tuple[int, int, int], str]:
+    """ Кратчайшие слова для всех 3-циклов, достижимых словами длины не
+    больше max_depth. Ключи - триплеты в стандартной записи Cycle3Lexica. """
+    res = dict()
+    bfs = BreadthFirstSearch(actions, max_states, spill_dir)
+    for ws, p in bfs.search(max_depth):
+        if p.len() != 3 or len(p._cycle_tuple()) != 1:
+            continue
+        triplet = Cycle3Lexica._standart_triplet(p._cycle_tuple()[0])
+        res.setdefault(triplet, ws)
+    return res
+
+
+def bidirectional_search(
+    target: DensePermutation,
+    max_depth: int,
+    max_states: Optional[int] = None,
+    actions: Optional[dict[str, DensePermutation]] = None,
+) -> Optional[str]:
+    """ Кратчайшее слово длины не больше max_depth, задающее перестановку
+    target, поиском навстречу (meet-in-the-middle).
+
+    Прямой фронт растет от тождественной перестановки: слово u переходит в
+    перестановку word(u). Обратный фронт растет от target: слово v переходит
+    в target * word(v)^-1, и добавление буквы X в начало v умножает ее на
+    X^-1. Фронты хранятся словарями образы -> слово, на каждом шаге
+    расширяется меньший из них. Когда перестановка встретилась в обоих
+    словарях, ответ u + v. Обходится примерно корень из числа состояний
+    обычного поиска в ширину. Если слово не найдено или словари превысили
+    max_states, возвращается None. """
+    actions = dict(actions or DENSE_ACT)
+    n = max(p.n for p in actions.values())
+    target_img = target._table[:n]
+    identity = bytes(range(n))
+
+    forward_moves = [(w, p._table) for w, p in actions.items()]
+    backward_moves = [(w, p.inverse()._table) for w, p in actions.items()]
+
+    forward = {identity: ''}
+    backward = {target_img: ''}
+    if target_img in forward:
+        return ''
+
+    forward_layer, backward_layer = [identity], [target_img]
+    depth_f = depth_b = 0
+    while depth_f + depth_b < max_depth:
+        if not forward_layer or not backward_layer:
+            return None
+
+        grow_forward = len(forward_layer) <= len(backward_layer)
+        if grow_forward:
+            visited, other, layer = forward, backward, forward_layer
+            moves = forward_moves
+            depth_f += 1
+        else:
+            visited, other, layer = backward, forward, backward_layer
+            moves = backward_moves
+            depth_b += 1
+
+        new_layer = []
+        for images in layer:
+            ws = visited[images]
+            for w, table in moves:
+                img = images.translate(table)
+                if img in visited:
+                    continue
+                new_ws = ws + w if grow_forward else w + ws
+                if img in other:
+                    if grow_forward:
+                        return new_ws + other[img]
+                    return other[img] + new_ws
+                if max_states is not None and \
+                        len(forward) + len(backward) >= max_states:
+                    return None
+                visited[img] = new_ws
+                new_layer.append(img)
+
+        if grow_forward:
+            forward_layer = new_layer
+        else:
+            backward_layer = new_layer
+
+    return None
+
+
+# Координаты, которые вместе задают состояние кубика с ориентациями.
+STATE_COORDINATES = \
+    [f'corner_subset_{i}' for i in range(len(CORNER_SUBSETS))] + \
+    [f'edge_subset_{i}' for i in range(len(EDGE_SUBSETS))]
+# Координаты, которые задают только положения кубиков, как Rubik.
+PERMUTATION_COORDINATES = ['corner_perm'] + \
+    [f'edge_perm_{i}' for i in range(len(EDGE_SUBSETS))]
+
+
+class _Timeout(Exception):
+    pass
+
+
+class IDAStar:
+    """ Поиск кратчайшего слова в образующих ACT с итеративным углублением
+    по оценке (IDA*).
+
+    Состояние задается координатами coordinates из rubik.tables и меняется
+    по их таблицам переходов. Цель - значения координат собранного кубика.
+    Оценка расстояния - максимум по таблицам расстояний (pattern_table)
+    координат: каждая из них не превосходит настоящего расстояния, поэтому
+    первое найденное слово кратчайшее. Слова перебираются только
+    канонические (как canonical_words_gen): без четырех одинаковых букв
+    подряд и с одним порядком коммутирующих противоположных граней.
+
+    После search флаг optimal показывает, доказано ли, что найденное слово
+    (или переданное best) кратчайшее, а nodes - число посещенных вершин. """
+
+    def __init__(self, coordinates: Sequence[str] = STATE_COORDINATES,
+                 directory: Optional[Path] = None):
+        self.coordinates = list(coordinates)
+        self._tables = [move_table(name, directory)._data
+                        for name in self.coordinates]
+        self._pdbs = [pattern_table(name, directory)
+                      for name in self.coordinates]
+        self._columns = [MOVE_INDEX[w] for w in LETTERS]
+        solved = CubieState().coordinates()
+        self.goal = tuple(solved[name] for name in self.coordinates)
+        self.optimal = False
+        self.nodes = 0
+
+    def start(self, state: CubieState) -> Tuple[int, ...]:
+        """ Координаты состояния, из которого ищется слово X такое, что
+        CubieState().apply(X) совпадает с state по координатам: это
+        обратное к state состояние. """
+        coords = state.inverse().coordinates()
+        return tuple(coords[name] for name in self.coordinates)
+
+    def heuristic(self, coords: Sequence[int]) -> int:
+        return max(pdb[c] for pdb, c in zip(self._pdbs, coords))
+
+    def search(
+        self,
+        state: CubieState,
+        max_depth: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        best: Optional[str] = None,
+    ) -> Optional[str]:
+        """ Кратчайшее слово длины не больше max_depth, которое собирает
+        state (CubieState().apply(слово) == state по координатам).
+
+        Порог длины растет от оценки стартового состояния. Если задано best
+        (например, слово Puzzle.word), ищутся только слова короче него, а
+        по истечении time_budget секунд возвращается лучшее найденное на
+        этот момент слово. Если слова нет, возвращается None. """
+        coords = self.start(state)
+        deadline = None if time_budget is None else \
+            time.monotonic() + time_budget
+        if best is not None:
+            limit = len(best) - 1
+            max_depth = limit if max_depth is None else min(max_depth, limit)
+        self.optimal = False
+        self.nodes = 0
+
+        tables, pdbs, goal = self._tables, self._pdbs, self.goal
+        moves = list(enumerate(self._columns))
+        path: List[int] = []
+
+        def dfs(coords, g, bound, last, run):
+            self.nodes += 1
+            if deadline is not None and self.nodes & 1023 == 0 and \
+                    time.monotonic() > deadline:
+                raise _Timeout()
+            if coords == goal:
+                return True
+            res = None
+            for i, col in moves:
+                if not allowed_next(last, run, i):
+                    continue
+                new = tuple(t[c * 6 + col] for t, c in zip(tables, coords))
+                f = g + 1 + max(pdb[c] for pdb, c in zip(pdbs, new))
+                if f > bound:
+                    res = f if res is None or f < res else res
+                    continue
+                path.append(i)
+                found = dfs(new, g + 1, bound,
+                            i, run + 1 if i == last else 1)
+                if found is True:
+                    return True
+                path.pop()
+                if found is not None and (res is None or found < res):
+                    res = found
+            return res
+
+        bound = self.heuristic(coords)
+        exhausted = False
+        try:
+            while max_depth is None or bound <= max_depth:
+                found = dfs(coords, 0, bound, -1, 0)
+                if found is True:
+                    self.optimal = True
+                    return ''.join(LETTERS[i] for i in path)
+                if found is None:
+                    exhausted = True
+                    break
+                bound = found
+        except _Timeout:
+            return best
+
+        # best кратчайшее, только если просмотрены все пороги короче него,
+        # а не поиск остановился на max_depth.
+        self.optimal = best is not None and (exhausted or bound >= len(best))
+        return best
+
+    def shorten(self, ws: str, window: int = 14,
+                time_budget: Optional[float] = None) -> str:
+        """ Укоротить слово ws, заменяя его отрезки длины window кратчайшими
+        словами с тем же действием на координатах. Отрезки просматриваются с
+        шагом window // 2, после замены просмотр возвращается на окно назад.
+        Возвращает лучшее слово, найденное за time_budget секунд. """
+        deadline = None if time_budget is None else \
+            time.monotonic() + time_budget
+        i = 0
+        while i + 1 < len(ws):
+            rest = None if deadline is None else deadline - time.monotonic()
+            if rest is not None and rest <= 0:
+                break
+            segment = ws[i:i + window]
+            res = self.search(CubieState().apply(segment), time_budget=rest,
+                              best=segment)
+            if len(res) < len(segment):
+                ws = normalize_word(ws[:i] + res + ws[i + window:])
+                i = max(0, i - window)
+            else:
+                i += max(1, window // 2)
+        self.optimal = False
+        return ws
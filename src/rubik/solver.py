@@ -1,9 +1,22 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Optional, Tuple
-
-from rubik.permutation import Permutation
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from rubik.cubie import CubieState
+from rubik.group import AnyPermutation, SiftSolver
+from rubik.lexica import DEFAULT_LEXICA, AnyLexica, CandidateLexica
+from rubik.lexica import get_candidate_lexica
+from rubik.permutation import DensePermutation, Permutation
+from rubik.representations import InvoluteRepresentation
+from rubik.search import PERMUTATION_COORDINATES, IDAStar
 from rubik.state import Rubik
-from rubik.words import ACT, Cycle3Lexica
+from rubik.tables import tables_dir
+from rubik.words import ACT, DENSE_ACT, normalize_word
 # from rubik.words import ACT, Cycle3Lexica
 
 
@@ -65,6 +78,34 @@ def swaps_to_triplets(swaps_list: List[Swap]) -> List[Triplet]:
     return res
 
 
+def cycle_triplets(cycles: List[List[int]]) -> List[Triplet]:
+    """ Разложить произведение независимых циклов в минимальное число
+    циклов длины 3.
+
+    Нечетный цикл (a1 a2 ... ak) равен (a1 a2 a3) (a1 a4 a5) ... и требует
+    (k - 1) / 2 триплетов. Четный цикл равен такому же произведению для
+    (a1 ... a(k-1)) и транспозиции (a1 ak). Оставшиеся транспозиции разных
+    циклов коммутируют с остальными множителями и собираются парами
+    (a b) (c d) = (a c b) (b d c). Итого цикл длины k стоит ceil((k - 1) / 2)
+    триплетов, а вся перестановка (n - число нечетных циклов) / 2, где n -
+    число перемещаемых точек; меньше получить нельзя. """
+    res, swaps = [], []
+    for cycle in cycles:
+        a = cycle[0]
+        odd = cycle if len(cycle) % 2 else cycle[:-1]
+        for i in range(1, len(odd) - 1, 2):
+            res.append((a, odd[i], odd[i + 1]))
+        if len(cycle) % 2 == 0:
+            swaps.append((a, cycle[-1]))
+
+    assert len(swaps) % 2 == 0, f"Only even permutations {cycles} can be decompose on triplets."
+    for (a, b), (c, d) in zip(swaps[::2], swaps[1::2]):
+        res.append((a, c, b))
+        res.append((b, d, c))
+
+    return res
+
+
 def permutation_triplets(p: Permutation) -> List[Triplet]:
     """ Представить перестановку на кубике рубика в виде произведение циклов
     длины 3. Если перестановки не существует, функция вернет None."""
@@ -75,45 +116,196 @@ def permutation_triplets(p: Permutation) -> List[Triplet]:
     # только четные перестановки, и перестановки не могут выводить из подгруппы,
     # итоговая перестановка должна быть кратна 4.
 
-    # Перестановка q на каждой из подгрупп четная.
-    vertex, edge = separate_swaps(p)
-    v_triplets = swaps_to_triplets(vertex)
-    e_triplets = swaps_to_triplets(edge)
-
-    return v_triplets + e_triplets
+    # Перестановка q на каждой из подгрупп четная. Циклы не выходят из своей
+    # подгруппы, поэтому каждая раскладывается отдельно.
+    VERTEX = set([i for i in range(1, 9)])
+    vertex, edge = [], []
+    for cycle in p.cycles():
+        if cycle[0] in VERTEX:
+            vertex.append(cycle)
+        else:
+            edge.append(cycle)
+
+    return cycle_triplets(vertex) + cycle_triplets(edge)
+
+
+def _rotations(cycle: List[int]) -> List[List[int]]:
+    return [cycle[i:] + cycle[:i] for i in range(len(cycle))]
+
+
+def triplet_alternatives(cycles: List[List[int]]) -> List[List[List[Triplet]]]:
+    """ Варианты разложения независимых циклов подгруппы на триплеты.
+
+    Циклы разбиваются на независимые части: каждый нечетный цикл отдельно,
+    четные циклы попарно (их транспозиции собираются вместе). Для части
+    возвращается список разложений cycle_triplets по всем выборам первой
+    точки циклов: число триплетов у них одинаковое, а сами триплеты, и
+    значит слова лексики, разные. """
+    odd = [c for c in cycles if len(c) % 2]
+    even = [c for c in cycles if len(c) % 2 == 0]
+    assert len(even) % 2 == 0, f"Only even permutations {cycles} can be decompose on triplets."
+
+    parts = [[cycle_triplets([r]) for r in _rotations(c)] for c in odd]
+    for c1, c2 in zip(even[::2], even[1::2]):
+        parts.append([cycle_triplets([r1, r2])
+                      for r1 in _rotations(c1) for r2 in _rotations(c2)])
+    return parts
+
+
+@lru_cache(maxsize=1 << 16)
+def _saving(left: str, right: str) -> int:
+    """ Сколько букв сокращается на стыке двух нормализованных слов. """
+    return len(left) + len(right) - len(normalize_word(left + right))
+
+
+# Сколько букв с каждой стороны стыка смотреть при подсчете сокращений.
+# Более глубокие каскады редки и все равно сокращаются в конце.
+_BOUNDARY = 8
+
+
+def assemble_word(p: AnyPermutation, lexica: CandidateLexica,
+                  postfix: str = '') -> str:
+    """ Собрать слово перестановки p из слов лексики, выбирая разложение на
+    триплеты и слова для них совместно.
+
+    Независимые части перестановки (triplet_alternatives) идут по порядку,
+    внутри части перебираются все ее разложения. Динамика хранит для
+    каждого последнего слова лучшую стоимость: сумму длин слов минус
+    сокращения на стыках соседних слов. Для каждого триплета
+    рассматриваются все его слова в CandidateLexica. Слово postfix
+    добавляется в конец с учетом стыка. """
+    if not isinstance(lexica, CandidateLexica):
+        raise TypeError("assemble_word expects CandidateLexica, use "
+                        "CandidateLexica.from_lexica.")
+    candidates = lexica.candidates
+
+    VERTEX = set(range(1, 9))
+    vertex = [c for c in p.cycles() if c[0] in VERTEX]
+    edge = [c for c in p.cycles() if c[0] not in VERTEX]
+    parts = triplet_alternatives(vertex) + triplet_alternatives(edge)
+
+    # Последнее слово -> (стоимость, номера слов по цепочке).
+    states: dict[str, Tuple[int, tuple]] = {'': (0, ())}
+
+    def step(states, words):
+        new_states = dict()
+        for ws in words:
+            best = None
+            for last, (cost, chain) in states.items():
+                c = cost + len(ws) - _saving(last[-_BOUNDARY:],
+                                             ws[:_BOUNDARY])
+                if best is None or c < best[0]:
+                    best = (c, (chain, ws))
+            new_states[ws] = best
+        return new_states
+
+    for alternatives in parts:
+        new_states: dict[str, Tuple[int, tuple]] = dict()
+        for triplets in alternatives:
+            alt = states
+            for tr in triplets:
+                alt = step(alt, candidates(tr))
+                if not alt:
+                    break
+            for last, val in alt.items():
+                if last not in new_states or val[0] < new_states[last][0]:
+                    new_states[last] = val
+        if not new_states:
+            raise ValueError(f"Triplets of {p} desn't exist in Lexica")
+        states = new_states
+
+    if postfix:
+        states = step(states, [postfix])
+
+    _, chain = min(states.values(), key=lambda v: v[0])
+    words = []
+    while chain:
+        chain, ws = chain
+        words.append(ws)
+    return normalize_word(''.join(reversed(words)))
+
+
+@lru_cache(maxsize=None)
+def sift_solver() -> SiftSolver:
+    """ Общий для процесса решатель просеиванием по образующим ACT. """
+    return SiftSolver(ACT)
+
+
+def solve_permutation(p: AnyPermutation,
+                      lexica: Optional[AnyLexica] = None) -> str:
+    """ Слово, которое кодирует перестановку кубиков p (как у
+    Rubik.permutation). По умолчанию берется лексика с вариантами слов из
+    общего реестра (rubik.lexica), разложение и слова выбирает
+    assemble_word. Обычная лексика оборачивается в CandidateLexica без
+    вариантов: по одному слову на триплет. """
+    if lexica is None:
+        lexica = get_candidate_lexica()
+    elif not isinstance(lexica, CandidateLexica):
+        lexica = CandidateLexica.from_lexica(lexica, top_k=1, variants=False)
+
+    if not isinstance(p, DensePermutation):
+        p = DensePermutation.from_permutation(p, len(Rubik.cells) + 1)
+    postfix = ''
+    vertex, _ = separate_swaps(p)
+    if len(vertex) % 2 != 0:
+        p = p * DENSE_ACT['O']
+        postfix = 'OOO'
+
+    return assemble_word(p, lexica, postfix)
+
+
+def ida_solver() -> IDAStar:
+    """ Общий для процесса поиск IDA* по положениям кубиков. Таблицы берутся
+    из каталога tables_dir() на момент вызова. """
+    return _ida_solver(tables_dir())
+
+
+@lru_cache(maxsize=None)
+def _ida_solver(directory: Path) -> IDAStar:
+    return IDAStar(PERMUTATION_COORDINATES, directory)
 
 
 class Puzzle(Rubik):
 
-    def word(self, lexica: Optional[Cycle3Lexica] = None):
-        """ Показать слово которое кодирует перестановку на стейте кубика. """
-        # TODO: сделать путь чтения лексики универсальным
-        if lexica is None:
-            lexica = Cycle3Lexica.load(Path('lexica/3dim_full'))
-
-        p = self.permutation()
-        postfix = ''
-        vertex, _ = separate_swaps(p)
-        if len(vertex) % 2 != 0:
-            p = p * ACT['O']
-            postfix = 'OOO'
-
-        tr_list = permutation_triplets(p)
-        res = ''
-        for tr in tr_list:
-            ws = lexica.get(tr)
-            if ws is None:
-                raise ValueError(f"Triplet {tr} desn't exist in Lexica")
-            res += ws
-
-        return res + postfix
+    def word(self, lexica: Optional[AnyLexica] = None):
+        """ Показать слово которое кодирует перестановку на стейте кубика,
+        см. solve_permutation. """
+        return solve_permutation(self.permutation(), lexica)
+
+    def sift_word(self, solver: Optional[SiftSolver] = None) -> str:
+        """ Показать слово которое кодирует перестановку на стейте кубика,
+        используя цепочку стабилизаторов вместо лексики 3-циклов. """
+        if solver is None:
+            solver = sift_solver()
+        return normalize_word(solver.word(self.permutation()))
+
+    def optimal_word(self, time_budget: float = 10.0,
+                     lexica: Optional[AnyLexica] = None) -> str:
+        """ Кратчайшее слово для стейта кубика поиском IDA* (ida_solver).
+
+        Поиск начинается со слова word и ищет только слова короче него.
+        Если за половину time_budget кратчайшее слово не найдено, остаток
+        времени уходит на укорачивание отрезков word (IDAStar.shorten), и
+        возвращается лучшее из найденного. Бюджет обязателен: для
+        случайного стейта полный поиск практически не завершается. """
+        if time_budget is None or time_budget <= 0:
+            raise ValueError("Time budget must be a positive number.")
+
+        solver = ida_solver()
+        deadline = time.monotonic() + time_budget
+        best = solver.search(CubieState.from_rubik(self),
+                             time_budget=time_budget / 2,
+                             best=self.word(lexica))
+        if solver.optimal:
+            return best
+        return solver.shorten(best, time_budget=deadline - time.monotonic())
 
     @classmethod
     def load(cls, path: Path):
         coloring = Rubik.load(path).coloring
         return Puzzle(coloring)
 
-    def instruction(self, lexica: Optional[Cycle3Lexica] = None):
+    def instruction(self, lexica: Optional[AnyLexica] = None):
         ws = self.word(lexica)
         print(f"Found word:\n\t{ws}")
 
@@ -137,8 +329,201 @@ class Puzzle(Rubik):
         return None
 
 
+State = Union[Rubik, CubieState, InvoluteRepresentation, AnyPermutation]
+
+# Форматы текстовых состояний: файлы Rubik.load и развертки
+# InvoluteRepresentation.load.
+STATE_FORMATS = ('rubik', 'involute')
+
+
+def state_format(text: str) -> str:
+    """ Определить формат текста состояния: в формате rubik строки состоят
+    из четырех полей 'x y z цвета', в развертке - из одного слова. """
+    for line in text.splitlines():
+        if line.strip():
+            return 'rubik' if len(line.split()) == 4 else 'involute'
+    raise ValueError("Empty state.")
+
+
+def parse_state(text: str, fmt: Optional[str] = None) -> Permutation:
+    """ Перестановка кубиков по тексту состояния в формате fmt (по умолчанию
+    определяется state_format). """
+    fmt = fmt or state_format(text)
+    if fmt == 'rubik':
+        return Rubik.loads(text).permutation()
+    if fmt == 'involute':
+        rep = InvoluteRepresentation.loads(text)
+        return CubieState.from_involute(rep).permutation()
+    raise ValueError(f"Unknown state format {fmt}.")
+
+
+def state_permutation(state: State) -> AnyPermutation:
+    """ Перестановка кубиков состояния любого из поддерживаемых видов. """
+    if isinstance(state, InvoluteRepresentation):
+        state = CubieState.from_involute(state)
+    if isinstance(state, (Rubik, CubieState)):
+        return state.permutation()
+    return state
+
+
+# Лексика процесса-исполнителя пула, задается _init_worker.
+_WORKER_LEXICA: Optional[AnyLexica] = None
+
+
+def _init_worker(name: Union[str, Path], top_k: int):
+    global _WORKER_LEXICA
+    _WORKER_LEXICA = get_candidate_lexica(name, top_k)
+
+
+def _solve_state(p: AnyPermutation,
+                 lexica: Optional[AnyLexica] = None) -> str:
+    return solve_permutation(p, lexica or _WORKER_LEXICA)
+
+
+def _solve_record(record: dict, lexica: Optional[AnyLexica] = None) -> dict:
+    """ Решить запись {'id', 'state', 'format'}. Ошибка разбора или
+    решения записывается в результат, а не прерывает весь поток. Записи с
+    полем error (их выдает read_states для нечитаемых строк) передаются в
+    результат как есть. """
+    res = {'id': record.get('id')}
+    if 'error' in record:
+        res['error'] = record['error']
+        return res
+    try:
+        state = record.get('state')
+        if not isinstance(state, str):
+            raise TypeError(f"State must be a string, got {state!r}.")
+        p = parse_state(state, record.get('format'))
+        ws = solve_permutation(p, lexica or _WORKER_LEXICA)
+    except Exception as e:
+        res['error'] = f'{type(e).__name__}: {e}'
+        return res
+    res['word'] = ws
+    res['length'] = len(ws)
+    return res
+
+
+def _imap(func, items: Iterable, processes: Optional[int],
+          lexica: Union[str, Path], top_k: int, chunksize: int) -> Iterator:
+    """ Применить func к items в пуле процессов с сохранением порядка.
+
+    Лексика загружается в родительском процессе до запуска пула: при fork
+    исполнители получают ее готовой и общей с родителем, иначе _init_worker
+    берет ее из реестра каждого исполнителя один раз. При processes=1 пул
+    не создается. """
+    candidates = get_candidate_lexica(lexica, top_k)
+    if processes == 1:
+        yield from map(partial(func, lexica=candidates), items)
+        return
+
+    with multiprocessing.Pool(processes, _init_worker,
+                              (lexica, top_k)) as pool:
+        yield from pool.imap(func, items, chunksize)
+
+
+def solve_many(
+    states: Iterable[State],
+    processes: Optional[int] = None,
+    lexica: Union[str, Path] = DEFAULT_LEXICA,
+    top_k: int = 4,
+    chunksize: int = 16,
+) -> Iterator[str]:
+    """ Решить набор состояний в пуле из processes процессов (по умолчанию
+    по числу ядер). Слова выдаются по мере готовности в порядке состояний.
+    Лексика и ее варианты берутся из общего реестра по имени lexica. """
+    perms = (state_permutation(state) for state in states)
+    yield from _imap(_solve_state, perms, processes, lexica, top_k,
+                     chunksize)
+
+
+def read_states(paths: Iterable[Path]) -> Iterator[dict]:
+    """ Записи {'id', 'state', 'format'} из потока входов.
+
+    Файл .jsonl (или '-' для stdin) содержит по объекту в строке с полем
+    state - текстом состояния и необязательными id и format. Каталог
+    читается как набор файлов состояний в порядке имен, любой другой путь -
+    как один файл состояния. Без id записи называются по пути. Строка,
+    которая не разбирается как объект JSON, выдается записью с полем error
+    и номером строки в id. """
+    for path in paths:
+        if str(path) == '-' or path.suffix == '.jsonl':
+            f = sys.stdin if str(path) == '-' else open(path, 'r')
+            try:
+                for i, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    name = f'{path}:{i}'
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield {'id': name, 'error': f'JSONDecodeError: {e}'}
+                        continue
+                    if not isinstance(record, dict):
+                        yield {'id': name, 'error': "Record must be a JSON "
+                                                    "object."}
+                        continue
+                    record.setdefault('id', name)
+                    yield record
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+        elif path.is_dir():
+            for file in sorted(path.iterdir()):
+                if file.is_file() and not file.name.startswith('.'):
+                    yield {'id': str(file), 'state': file.read_text()}
+        else:
+            yield {'id': str(path), 'state': path.read_text()}
+
+
+def solve_records(
+    records: Iterable[dict],
+    processes: Optional[int] = None,
+    lexica: Union[str, Path] = DEFAULT_LEXICA,
+    top_k: int = 4,
+    chunksize: int = 16,
+) -> Iterator[dict]:
+    """ Решить записи read_states в пуле процессов. Результаты {'id',
+    'word', 'length'} или {'id', 'error'} выдаются в порядке записей. """
+    yield from _imap(_solve_record, records, processes, lexica, top_k,
+                     chunksize)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m rubik.solver',
+        description="Решение состояний кубика словами из лексики 3-циклов.")
+    parser.add_argument(
+        'inputs', nargs='*', type=Path,
+        help="Файлы .jsonl ('-' - stdin), каталоги и файлы состояний. Без "
+             "входов показывается пошаговая инструкция для "
+             "src/rubik/state.txt.")
+    parser.add_argument(
+        '-o', '--output', type=Path, default=None,
+        help="Файл результатов в JSONL (по умолчанию stdout).")
+    parser.add_argument(
+        '-j', '--processes', type=int, default=None,
+        help="Число процессов (по умолчанию по числу ядер).")
+    parser.add_argument('--lexica', default=DEFAULT_LEXICA)
+    parser.add_argument('--top-k', type=int, default=4)
+    parser.add_argument('--chunksize', type=int, default=16)
+    args = parser.parse_args(argv)
+
+    lexica = get_candidate_lexica(args.lexica, args.top_k)
+    if not args.inputs:
+        cube = Puzzle.load(Path('src/rubik/state.txt'))
+        cube.instruction(lexica)
+        return
+
+    out = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        results = solve_records(read_states(args.inputs), args.processes,
+                                args.lexica, args.top_k, args.chunksize)
+        for res in results:
+            out.write(json.dumps(res, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
 if __name__ == '__main__':
-    cube = Puzzle.load(Path('src/rubik/state.txt'))
-    lexica = Cycle3Lexica.load(Path('lexica/3dim_full'))
-    ws = cube.word(lexica)
-    cube.instruction(lexica)
+    main()
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Tuple
 from pathlib import Path
 
 from rubik.permutation import Permutation
@@ -40,6 +40,10 @@ class Rubik:
         Vector(0, 1, -1),   # 20
     ]
 
+    # Номера кубиков в перестановке: углы 1..8, ребра 9..20.
+    corners = range(1, 9)
+    edges = range(9, 21)
+
     def __init__(self, coloring: Optional[ColoringCell] = None):
         self.cells_index = {cell: i + 1 for i, cell in enumerate(self.cells)}
         self._coloring = {cell: cell for cell in self.cells}
@@ -72,6 +76,23 @@ class Rubik:
 
         return Permutation(perm)
 
+    def coordinates(self) -> Tuple[int, int]:
+        """ Компактные координаты стейта: номера (код Лемера) перестановок
+        углов (< 8!) и ребер (< 12!). Ориентации Rubik не хранит, их
+        координаты считаются по векторам ориентаций в rubik.coordinates. """
+        p = self.permutation()
+        return p.rank(self.corners), p.rank(self.edges)
+
+    @classmethod
+    def from_coordinates(cls, corners: int, edges: int) -> Rubik:
+        """ Восстановить стейт по координатам из coordinates. """
+        p = Permutation.unrank(corners, cls.corners) * \
+            Permutation.unrank(edges, cls.edges)
+        coloring = dict()
+        for k, v in p._perm.items():
+            coloring[cls.cells[v - 1]] = cls.cells[k - 1]
+        return cls(coloring)
+
     def act(self, color: Color) -> Rubik:
         """ Применить элементарное действие на стейте. """
         coloring = dict()
@@ -93,17 +114,25 @@ class Rubik:
 
             self.act(color)
 
+    @classmethod
+    def loads(cls, text: str) -> Rubik:
+        """ Прочитать состояние из строки в формате файла load: строки
+        'x y z цвета'. """
+        coloring: ColoringCell = dict()
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            x, y, z, color = line.split()
+            cell_a = Vector(int(x), int(y), int(z))
+            cell_b = cell(color)
+            coloring[cell_a] = cell_b
+        return cls(coloring)
+
     @classmethod
     def load(cls, path: Path) -> Rubik:
         """ Загрузить состояние из файла. """
-        coloring: ColoringCell = dict()
         with open(path, 'r') as f:
-            for line in f:
-                x, y, z, color = line.split()
-                cell_a = Vector(int(x), int(y), int(z))
-                cell_b = cell(color)
-                coloring[cell_a] = cell_b
-        return Rubik(coloring)
+            return cls.loads(f.read())
 
     def save(self, path: Path):
         # TODO
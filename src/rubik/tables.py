@@ -0,0 +1,277 @@
+from __future__ import annotations
+import mmap
+import os
+from array import array
+from functools import lru_cache, partial
+from math import perm
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Union
+
+from rubik.coloring import Color
+from rubik.coordinates import lehmer_rank, lehmer_unrank, orientation_rank
+from rubik.coordinates import orientation_unrank, partial_rank, partial_unrank
+from rubik.coordinates import subset_rank, subset_unrank
+from rubik.cubie import CORNER_SUBSETS, EDGE_SUBSETS, MOVES, CubieState, Move
+
+# Порядок действий в строке таблицы.
+MOVE_ORDER = [color.name for color in Color]
+MOVE_INDEX = {name: i for i, name in enumerate(MOVE_ORDER)}
+
+TABLES_VERSION = 1
+
+
+def tables_dir() -> Path:
+    """ Каталог для кеша таблиц, задается переменной RUBIK_TABLES. """
+    default = Path.home() / '.cache' / 'rubik'
+    return Path(os.environ.get('RUBIK_TABLES', default))
+
+
+def _corner_perm(c: int, m: Move) -> int:
+    slots = lehmer_unrank(c, 8)
+    return lehmer_rank([m.corner_slot[s] for s in slots])
+
+
+def _corner_twist(c: int, m: Move) -> int:
+    ori = orientation_unrank(c, 8, 3)
+    res = [0] * 8
+    for j, o in enumerate(ori):
+        res[m.corner_slot[j]] = (o + m.corner_twist[j]) % 3
+    return orientation_rank(res, 3)
+
+
+def _edge_flip(c: int, m: Move) -> int:
+    ori = orientation_unrank(c, 12, 2)
+    res = [0] * 12
+    for j, o in enumerate(ori):
+        res[m.edge_slot[j]] = (o + m.edge_flip[j]) % 2
+    return orientation_rank(res, 2)
+
+
+def _edge_positions(c: int, m: Move) -> int:
+    slots = partial_unrank(c, 12, 4)
+    return partial_rank([m.edge_slot[s] for s in slots], 12)
+
+
+def _typecode(size: int) -> str:
+    """ Тип ячейки таблицы: два байта, если значения координаты в них
+    помещаются, иначе четыре. """
+    return 'H' if size <= 1 << 16 else 'I'
+
+
+def _subset_step(c: int, slot_move: bytes, ori_move: bytes, n: int,
+                 base: int) -> int:
+    slots, ori = subset_unrank(c, n, 4, base)
+    return subset_rank([slot_move[s] for s in slots],
+                       [(o + ori_move[s]) % base for s, o in zip(slots, ori)],
+                       n, base)
+
+
+def _corner_subset(c: int, m: Move) -> int:
+    return _subset_step(c, m.corner_slot, m.corner_twist, 8, 3)
+
+
+def _edge_subset(c: int, m: Move) -> int:
+    return _subset_step(c, m.edge_slot, m.edge_flip, 12, 2)
+
+
+def _subset_table(n: int, base: int) -> array:
+    """ Таблица координаты четверки кубиков (subset_rank) целиком. Слоты
+    выборки и приращения ориентаций считаются один раз на выборку и
+    действие, а ориентации четверки меняются поразрядным сложением по модулю
+    base, которое от слотов не зависит. Быстрее поэлементного построения в
+    десятки раз. """
+    b4 = base ** 4
+    weights = [base ** (3 - j) for j in range(4)]
+    digits = [[x // w % base for w in weights] for x in range(b4)]
+    # shift[d][a] - ориентации a после приращений d.
+    shift = [[sum((x + y) % base * w for x, y, w in zip(da, dd, weights))
+              for da in digits] for dd in digits]
+
+    moves = [MOVES[key] for key in MOVE_ORDER]
+    positions = perm(n, 4)
+    typecode = _typecode(positions * b4)
+    data = array(typecode, [0]) * (positions * b4 * len(moves))
+    for pos in range(positions):
+        slots = partial_unrank(pos, n, 4)
+        for i, m in enumerate(moves):
+            if n == 8:
+                slot_move, ori_move = m.corner_slot, m.corner_twist
+            else:
+                slot_move, ori_move = m.edge_slot, m.edge_flip
+            new = partial_rank([slot_move[s] for s in slots], n) * b4
+            d = sum(ori_move[s] * w for s, w in zip(slots, weights))
+            start = pos * b4 * 6 + i
+            data[start:start + b4 * 6:6] = \
+                array(typecode, [new + a for a in shift[d]])
+    return data
+
+
+# Координаты: размер и переход по одному действию.
+COORDINATES: dict[str, tuple[int, Callable[[int, Move], int]]] = {
+    # Номер перестановки углов (кубик -> слот), как в Rubik.coordinates.
+    'corner_perm': (40320, _corner_perm),
+    # Ориентации углов по слотам.
+    'corner_twist': (3 ** 7, _corner_twist),
+    # Ориентации ребер по слотам.
+    'edge_flip': (2 ** 11, _edge_flip),
+    # Слоты ребер 9..12, 13..16 и 17..20 (номера кубиков Rubik).
+    'edge_perm_0': (11880, _edge_positions),
+    'edge_perm_1': (11880, _edge_positions),
+    'edge_perm_2': (11880, _edge_positions),
+    # Слоты и ориентации углов 1..4 и 5..8.
+    'corner_subset_0': (1680 * 81, _corner_subset),
+    'corner_subset_1': (1680 * 81, _corner_subset),
+    # Слоты и ориентации ребер 9..12, 13..16 и 17..20.
+    'edge_subset_0': (11880 * 16, _edge_subset),
+    'edge_subset_1': (11880 * 16, _edge_subset),
+    'edge_subset_2': (11880 * 16, _edge_subset),
+}
+
+
+# Координаты, таблицы которых строятся целиком, а не по ячейкам.
+_TABLE_BUILDERS: dict[str, Callable[[], array]] = {
+    **{f'corner_subset_{i}': partial(_subset_table, 8, 3)
+       for i in range(len(CORNER_SUBSETS))},
+    **{f'edge_subset_{i}': partial(_subset_table, 12, 2)
+       for i in range(len(EDGE_SUBSETS))},
+}
+
+
+class MoveTable:
+    """ Таблица переходов координаты: (координата, действие) -> координата.
+
+    Значения хранятся подряд по строкам, строка координаты c занимает ячейки
+    c * 6 .. c * 6 + 5 в порядке MOVE_ORDER. Данные могут быть как массивом в
+    памяти, так и отображенным с диска файлом. Отображение освобождает close
+    (или выход из блока with), после этого таблицей пользоваться нельзя. """
+
+    def __init__(self, name: str, data: Sequence[int],
+                 mm: Optional[mmap.mmap] = None):
+        self.name = name
+        self.size = len(data) // len(MOVE_ORDER)
+        self._data = data
+        self._mmap = mm
+
+    def close(self):
+        """ Освободить отображение файла таблицы. """
+        if self._mmap is None:
+            return
+        self._data.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self) -> MoveTable:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def move(self, coord: int, move: Union[Color, str]) -> int:
+        """ Координата после действия move. """
+        if isinstance(move, Color):
+            move = move.name
+        return self._data[coord * 6 + MOVE_INDEX[move.upper()]]
+
+    def apply(self, coord: int, ws: str) -> int:
+        """ Координата после слова ws (действия слева направо). """
+        data = self._data
+        for w in ws.upper():
+            coord = data[coord * 6 + MOVE_INDEX[w]]
+        return coord
+
+    @classmethod
+    def build(cls, name: str) -> MoveTable:
+        """ Посчитать таблицу координаты name. """
+        if name in _TABLE_BUILDERS:
+            return cls(name, _TABLE_BUILDERS[name]())
+
+        size, step = COORDINATES[name]
+        moves = [MOVES[key] for key in MOVE_ORDER]
+        data = array(_typecode(size), [0]) * (size * len(moves))
+        for c in range(size):
+            for i, m in enumerate(moves):
+                data[c * 6 + i] = step(c, m)
+        return cls(name, data)
+
+    def save(self, path: Path):
+        """ Записать таблицу в файл (атомарно, через временный файл). """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(memoryview(self._data).cast('B'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, name: str, path: Path) -> MoveTable:
+        """ Отобразить файл таблицы в память без чтения целиком. """
+        size, _ = COORDINATES[name]
+        typecode = _typecode(size)
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) != size * len(MOVE_ORDER) * array(typecode).itemsize:
+            mm.close()
+            raise ValueError(f"Table file {path} has wrong size.")
+        return cls(name, memoryview(mm).cast(typecode), mm)
+
+
+@lru_cache(maxsize=None)
+def move_table(name: str, directory: Optional[Path] = None) -> MoveTable:
+    """ Таблица координаты name. При первом обращении таблица строится и
+    сохраняется в кеш на диске, дальше файл отображается в память. Таблица
+    общая для процесса и остается открытой, закрывать ее не нужно. """
+    if name not in COORDINATES:
+        raise KeyError(f"Unknown coordinate {name}.")
+
+    directory = directory or tables_dir()
+    path = directory / f'{name}.v{TABLES_VERSION}.bin'
+    if path.exists():
+        try:
+            return MoveTable.load(name, path)
+        except ValueError:
+            pass
+
+    table = MoveTable.build(name)
+    table.save(path)
+    return MoveTable.load(name, path)
+
+
+@lru_cache(maxsize=None)
+def pattern_table(name: str, directory: Optional[Path] = None) -> bytes:
+    """ Таблица расстояний (pattern database) координаты name: для каждого
+    значения координаты длина кратчайшего слова, которое переводит его в
+    значение собранного кубика. Это нижняя оценка длины решения всего
+    кубика. Таблица строится поиском в ширину от собранного значения по
+    обратным действиям (X^-1 = XXX) и хранится в кеше рядом с таблицами
+    переходов. """
+    if name not in COORDINATES:
+        raise KeyError(f"Unknown coordinate {name}.")
+
+    directory = directory or tables_dir()
+    path = directory / f'{name}.pdb.v{TABLES_VERSION}.bin'
+    size, _ = COORDINATES[name]
+    if path.exists():
+        dist = path.read_bytes()
+        if len(dist) == size:
+            return dist
+
+    data = move_table(name, directory)._data
+    goal = CubieState().coordinates()[name]
+    dist = bytearray(b'\xff') * size
+    dist[goal] = 0
+    layer, depth = [goal], 0
+    while layer:
+        depth += 1
+        new_layer = []
+        for c in layer:
+            for i in range(len(MOVE_ORDER)):
+                prev = data[data[data[c * 6 + i] * 6 + i] * 6 + i]
+                if dist[prev] == 255:
+                    dist[prev] = depth
+                    new_layer.append(prev)
+        layer = new_layer
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_bytes(dist)
+    os.replace(tmp, path)
+    return bytes(dist)
@@ -1,11 +1,14 @@
 from __future__ import annotations
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations, combinations_with_replacement, product
 from math import comb, factorial
 from pathlib import Path
-from typing import Generator, List, Optional, Tuple
+from typing import Generator, Iterator, List, Optional, Tuple
 
 from tqdm import tqdm
-from rubik.permutation import Permutation
+from rubik.permutation import DensePermutation, Permutation
 from rubik.coloring import Color
 from rubik.state import Rubik
 
@@ -19,14 +22,80 @@ ACT = {
     'R': Rubik().act(Color.R).permutation(),
 }
 
+# Те же действия в плотной кодировке на точках 0..20 (точка 0 неподвижна).
+DENSE_ACT = {
+    key: DensePermutation.from_permutation(p, len(Rubik.cells) + 1).intern()
+    for key, p in ACT.items()
+}
+_DENSE_IDENTITY = DensePermutation(range(len(Rubik.cells) + 1))
+
+
+def dense_word(ws: str) -> DensePermutation:
+    """ Конвертировать слово в плотную перестановку. """
+    images = _DENSE_IDENTITY._img
+    for w in ws.upper():
+        images = images.translate(DENSE_ACT[w]._table)
+    return DensePermutation._from_images(images)
+
 
 def word(ws: str) -> Permutation:
     """ Конвертировать слово в перестановку. """
-    p = Permutation()
-    for w in ws:
-        p *= ACT[w.upper()]
-    return p
-
+    return dense_word(ws).to_permutation()
+
+
+def inverse_word(ws: str) -> str:
+    """ Слово обратной перестановки. Движения только по часовой стрелке,
+    поэтому обратное к X записывается как XXX. """
+    return ''.join(w * 3 for w in reversed(ws.upper()))
+
+
+def reduce_runs(ws: str) -> str:
+    """ Сократить серии одинаковых букв по модулю 4 (XXXX - тождество). """
+    stack: List[List] = []
+    for w in ws.upper():
+        if stack and stack[-1][0] == w:
+            stack[-1][1] += 1
+            if stack[-1][1] == 4:
+                stack.pop()
+        else:
+            stack.append([w, 1])
+    return ''.join(w * k for w, k in stack)
+
+
+# Ось каждой буквы и ее место на оси: действия одной оси (противоположные
+# грани) коммутируют, внутри оси грани записываются в порядке ACT.
+AXIS = {'O': (0, 1), 'R': (0, 2), 'B': (1, 1), 'G': (1, 2),
+        'Y': (2, 1), 'W': (2, 2)}
+# Грани каждой оси в порядке ACT.
+AXIS_FACES = ['OR', 'BG', 'YW']
+
+
+def normalize_word(ws: str) -> str:
+    """ Привести слово к канонической форме той же перестановки.
+
+    Слово читается слева направо в стек блоков: блок - подряд идущие
+    действия одной оси с числом поворотов каждой грани по модулю 4. Буква
+    той же оси, что и верхний блок, меняет его счетчик, иначе открывает
+    новый блок. Опустевший блок снимается со стека, и следующая буква
+    сокращается уже с предыдущим блоком, поэтому сокращения идут и через
+    границы слов лексики (X и XXX, XXXX, O R O... и т. п.). В ответе грани
+    блока записываются в порядке ACT, так что результат является
+    каноническим словом (см. canonical_words_gen). """
+    stack: List[List[int]] = []
+    for w in ws.upper():
+        axis, i = AXIS[w]
+        if stack and stack[-1][0] == axis:
+            block = stack[-1]
+        else:
+            block = [axis, 0, 0]
+            stack.append(block)
+        block[i] = (block[i] + 1) % 4
+        if block[1] == 0 and block[2] == 0:
+            stack.pop()
+
+    faces = AXIS_FACES
+    return ''.join(faces[axis][0] * a + faces[axis][1] * b
+                   for axis, a, b in stack)
 
 
 def _combination_of_splits(n: int, k: int) -> int:
@@ -40,17 +109,82 @@ def _combination_of_splits(n: int, k: int) -> int:
     return cum
 
 
-def words_gen(n: int, k: int = 2) -> \
-        Generator[Tuple[str, Permutation], None, None]:
+def words_gen(n: int, k: int = 2, prefix: str = '') -> \
+        Generator[Tuple[str, DensePermutation], None, None]:
     """ Генератор всевозможных слов длины n в которых участвует k и более
-    различных элементов. Возвращает пару (слово, перестановка). """
-
-    for arr in product(*[ACT for _ in range(n)]):
-        w = ''.join(arr)
-        if len(set(w)) < k:
+    различных элементов. Возвращает пару (слово, перестановка). Если задан
+    prefix, перебираются только слова с этим началом.
+
+    Слова перебираются обходом дерева префиксов в глубину в том же порядке,
+    что и product(ACT, ...). Перестановка префикса передается вниз по
+    дереву, так что каждый узел стоит одного умножения, а число различных
+    букв считается по маске. Ветки, в которых до конца слова уже не набрать
+    k различных букв, отсекаются. """
+    return _words_dfs(n, k, prefix, canonical=False)
+
+
+def canonical_words_gen(n: int, k: int = 2, prefix: str = '') -> \
+        Generator[Tuple[str, DensePermutation], None, None]:
+    """ То же, что words_gen, но только канонические слова: серии одной
+    буквы не длиннее 3 (XXXX - тождество), а действия противоположных
+    граней (O и R, B и G, Y и W) коммутируют, поэтому подряд идущие
+    действия одной оси записываются в порядке ACT. Остальные слова
+    совпадают с каноническими после таких перестановок и сокращений. """
+    return _words_dfs(n, k, prefix, canonical=True)
+
+
+# Буквы действий в порядке ACT, номера букв в allowed_next - индексы в нем.
+LETTERS = list(ACT)
+# Номер противоположной грани для каждой буквы в порядке ACT.
+_OPPOSITE = [LETTERS.index(w) for w in 'RGWYBO']
+
+
+def allowed_next(last: int, run: int, i: int) -> bool:
+    """ Можно ли продолжить каноническое слово, которое кончается серией
+    длины run буквы с номером last, буквой с номером i. """
+    if i == last:
+        return run < 3
+    return _OPPOSITE[i] != last or last < i
+
+
+def _words_dfs(n: int, k: int, prefix: str, canonical: bool) -> \
+        Generator[Tuple[str, DensePermutation], None, None]:
+    moves = [(w, DENSE_ACT[w]._table, 1 << i) for i, w in enumerate(ACT)]
+    prefix = prefix.upper()
+    used, last, run = 0, -1, 0
+    for w in prefix:
+        i = LETTERS.index(w)
+        used |= 1 << i
+        last, run = i, run + 1 if i == last else 1
+    start = dense_word(prefix)._img
+
+    if len(prefix) >= n:
+        if len(prefix) == n and bin(used).count('1') >= k:
+            yield prefix, DensePermutation._from_images(start)
+        return
+
+    stack = [(prefix, start, used, last, run)]
+    while stack:
+        ws, images, used, last, run = stack.pop()
+        rest = n - len(ws) - 1
+        if rest == 0:
+            # Последний уровень разворачиваем сразу, без стека.
+            for i, (w, table, bit) in enumerate(moves):
+                if canonical and not allowed_next(last, run, i):
+                    continue
+                if bin(used | bit).count('1') >= k:
+                    yield ws + w, \
+                        DensePermutation._from_images(images.translate(table))
             continue
-        p = word(w)
-        yield (w, p)
+
+        for i in range(len(moves) - 1, -1, -1):
+            if canonical and not allowed_next(last, run, i):
+                continue
+            w, table, bit = moves[i]
+            u = used | bit
+            if bin(u).count('1') + rest >= k:
+                stack.append((ws + w, images.translate(table), u,
+                              i, run + 1 if i == last else 1))
 
 
 def total_words_volume(n: int, k: int) -> int:
@@ -66,6 +200,177 @@ def total_words_volume(n: int, k: int) -> int:
     return total
 
 
+def canonical_words_volume(n: int, k: int = 2) -> int:
+    """ Точное количество слов, порождаемых canonical_words_gen. Считается
+    динамикой по состояниям (маска букв, последняя буква, длина серии). """
+    states = {(0, -1, 0): 1}
+    for _ in range(n):
+        new_states: dict[Tuple[int, int, int], int] = dict()
+        for (used, last, run), count in states.items():
+            for i in range(len(LETTERS)):
+                if not allowed_next(last, run, i):
+                    continue
+                key = (used | 1 << i, i, run + 1 if i == last else 1)
+                new_states[key] = new_states.get(key, 0) + count
+        states = new_states
+
+    return sum(count for (used, _, _), count in states.items()
+               if bin(used).count('1') >= k)
+
+
+def _commutator_words(
+    words_a: dict[str, DensePermutation],
+    words_b: dict[str, DensePermutation],
+    progress: bool = True,
+) -> Generator[str, None, None]:
+    """ Перебрать пары слов и вернуть слова (w1 w2)^2 и (w2 w1)^2, которые
+    дают 3-цикл. """
+
+    t_pairs = len(words_a) * len(words_b)
+    pairs = product(words_a, words_b)
+    for w1, w2 in tqdm(pairs, total=t_pairs, disable=not progress):
+        p1 = words_a[w1]
+        p2 = words_b[w2]
+
+        q = (p1 * p2) ** 2
+        if q.len() == 3:
+            yield w1 + w2 + w1 + w2
+
+        q = (p2 * p1) ** 2
+        if q.len() == 3:
+            yield w2 + w1 + w2 + w1
+
+
+def _commutator_words_batch(
+    words_a: dict[str, DensePermutation],
+    words_b: dict[str, DensePermutation],
+    batch_size: int,
+    progress: bool = True,
+) -> Generator[str, None, None]:
+    """ То же, что _commutator_words, но произведения считаются порциями
+    через numpy. Порядок слов совпадает с последовательной версией. """
+    import numpy as np
+    from rubik.batch import PermutationBatch
+
+    keys_a, keys_b = list(words_a), list(words_b)
+    batch_a = PermutationBatch.from_permutations(words_a.values())
+    batch_b = PermutationBatch.from_permutations(words_b.values())
+
+    total = len(keys_a) * len(keys_b)
+    with tqdm(total=total, disable=not progress) as bar:
+        for i, j, p1p2 in batch_a.cross(batch_b, batch_size):
+            p2p1 = PermutationBatch._from_matrix(batch_b.matrix[j]) * \
+                PermutationBatch._from_matrix(batch_a.matrix[i])
+            mask_12 = (p1p2 ** 2).support() == 3
+            mask_21 = (p2p1 ** 2).support() == 3
+            for k in np.flatnonzero(mask_12 | mask_21):
+                w1, w2 = keys_a[i[k]], keys_b[j[k]]
+                if mask_12[k]:
+                    yield w1 + w2 + w1 + w2
+                if mask_21[k]:
+                    yield w2 + w1 + w2 + w1
+            bar.update(len(i))
+
+
+def _words_shard(prefix: str, n: int, k: int) -> \
+        List[Tuple[str, DensePermutation]]:
+    """ Слова длины n с началом prefix для первой фазы bruteforse: как у
+    words_gen, но только те, у которых порядок перестановки делится на 5
+    или 7. """
+    return [(w, p) for w, p in words_gen(n, k, prefix)
+            if p.deg() % 7 == 0 or p.deg() % 5 == 0]
+
+
+def _commutator_shard(
+    words_a: List[str],
+    words_b: List[str],
+    batch_size: Optional[int] = None,
+) -> Tuple[dict[Tuple[int, int, int], str], List[str]]:
+    """ Часть второй фазы bruteforse для процесса: коммутаторы слов words_a
+    со всеми словами words_b. Возвращает частичную лексику и найденные
+    слова в порядке перебора. """
+    dict_a = {w: dense_word(w) for w in words_a}
+    dict_b = {w: dense_word(w) for w in words_b}
+    if batch_size is None:
+        pair_words = _commutator_words(dict_a, dict_b, progress=False)
+    else:
+        pair_words = _commutator_words_batch(dict_a, dict_b, batch_size,
+                                             progress=False)
+    log = list(pair_words)
+    lexica = Cycle3Lexica()
+    lexica.add(*log)
+    return lexica.vocab, log
+
+
+def _commutator_chunks(
+    keys_a: List[str],
+    keys_b: List[str],
+    chunk_rows: int,
+    batch_size: Optional[int] = None,
+    processes: Optional[int] = None,
+) -> Iterator[Tuple[int, dict[Tuple[int, int, int], str], List[str]]]:
+    """ Перебрать коммутаторы порциями по chunk_rows слов из keys_a (со
+    всеми словами keys_b). Для каждой порции по порядку возвращается число
+    обработанных слов keys_a, частичная лексика и найденные слова. Если
+    задан processes, порции считаются на пуле процессов. """
+    chunks = [keys_a[i:i + chunk_rows]
+              for i in range(0, len(keys_a), chunk_rows)]
+    args = (chunks, [keys_b] * len(chunks), [batch_size] * len(chunks))
+    if processes is None:
+        for chunk, (vocab, words) in zip(chunks, map(_commutator_shard, *args)):
+            yield len(chunk), vocab, words
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        results = pool.map(_commutator_shard, *args)
+        for chunk, (vocab, words) in zip(chunks, results):
+            yield len(chunk), vocab, words
+
+
+def commutator_vocab(
+    words_a: dict[str, DensePermutation],
+    words_b: dict[str, DensePermutation],
+    batch_size: Optional[int] = None,
+    processes: Optional[int] = None,
+) -> Tuple[dict[Tuple[int, int, int], str], List[str]]:
+    """ Коммутаторы (w1 w2)^2 и (w2 w1)^2 всех пар слов, дающие 3-цикл,
+    на пуле из processes процессов. Слова words_a делятся на порции, каждый
+    процесс возвращает частичную лексику, которые сливаются по правилу
+    Cycle3Lexica.add (остается более короткое слово). Порции сливаются по
+    порядку, поэтому результат и порядок слов совпадают с
+    последовательным перебором. """
+    keys_a, keys_b = list(words_a), list(words_b)
+    # Порций больше, чем процессов, чтобы процессы не простаивали в конце.
+    n_shards = max(1, min(len(keys_a), 4 * (processes or 1)))
+    step = max(1, -(-len(keys_a) // n_shards))
+
+    lexica = Cycle3Lexica()
+    log = []
+    chunks = _commutator_chunks(keys_a, keys_b, step, batch_size, processes)
+    for _, vocab, words in tqdm(chunks, total=-(-len(keys_a) // step)):
+        lexica.merge(vocab)
+        log += words
+    return lexica.vocab, log
+
+
+def _write_checkpoint(path: Path, state: dict):
+    """ Атомарно записать состояние перебора в json. """
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    state = dict(state)
+    state['vocab'] = [[*tr, ws] for tr, ws in state['vocab'].items()]
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _read_checkpoint(path: Path) -> dict:
+    with open(path, 'r') as f:
+        state = json.load(f)
+    state['vocab'] = {(a, b, c): ws for a, b, c, ws in state['vocab']}
+    return state
+
+
 def instruction(ws: str):
     for w in ws:
         print(w)
@@ -87,7 +392,7 @@ class Cycle3Lexica:
         двух версий будет выбрана короткая. """
 
         for ws in word_list:
-            p = word(ws)
+            p = dense_word(ws)
             cycle = p.cycles()
             assert len(cycle) == 1
             assert len(cycle[0]) == 3
@@ -112,6 +417,22 @@ class Cycle3Lexica:
             a, b, c = tr
             return min((a, b, c), (b, c, a), (c, a, b))
 
+    def merge(self, vocab: dict[Tuple[int, int, int], str]):
+        """ Слить частичную лексику: для каждого триплета остается более
+        короткое слово, при равной длине - уже имеющееся. """
+        for triplet, ws in vocab.items():
+            known = self.vocab.get(triplet)
+            if known is None or len(ws) < len(known):
+                self.vocab[triplet] = ws
+
+    def copy(self) -> Cycle3Lexica:
+        """ Независимая копия лексики: изменения копии не затрагивают
+        исходную. """
+        other = Cycle3Lexica()
+        other.vocab = dict(self.vocab)
+        other.full_vocab = list(self.full_vocab)
+        return other
+
     def get(self, tr: Tuple[int, int, int]) -> Optional[str]:
         tr_ = self._standart_triplet(tr)
         return self.vocab.get(tr_)
@@ -139,80 +460,256 @@ class Cycle3Lexica:
         with open(path, 'w') as f:
             f.write('\n'.join(words_list))
 
-    def bruteforse(self, log_file=None):
+    def bruteforse(self, log_file=None, batch_size: Optional[int] = None,
+                   processes: Optional[int] = None,
+                   checkpoint: Optional[Path] = None,
+                   checkpoint_every: int = 64):
+        """ Перебрать коммутаторы (w1 w2)^2 слов длины 5 и добавить в лексику
+        те, что дают 3-цикл. Если задан batch_size, произведения пар
+        считаются порциями такого размера через numpy (rubik.batch). Если
+        задан processes, обе фазы перебора делятся между процессами.
+
+        Найденные слова дописываются в log_file по мере перебора. Если задан
+        checkpoint, после каждых checkpoint_every слов первого множителя в
+        этот файл записываются курсор перебора, текущая лексика и длина лога.
+        Если файл checkpoint уже есть, перебор продолжается с сохраненного
+        места, а лог обрезается до сохраненной длины (см. resume). Если лог
+        короче сохраненной длины или его нет, возобновление с потерей
+        найденных слов невозможно и поднимается ValueError. """
+        state = {'row': 0, 'done': False, 'log_size': 0, 'vocab': self.vocab}
+        if checkpoint is not None and Path(checkpoint).exists():
+            state = _read_checkpoint(checkpoint)
+            log_size = Path(log_file).stat().st_size \
+                if log_file and Path(log_file).exists() else 0
+            if log_file and log_size < state['log_size']:
+                raise ValueError(
+                    f"Log {log_file} doesn't match checkpoint {checkpoint}: "
+                    f"expected at least {state['log_size']} bytes, "
+                    f"found {log_size}.")
+            self.vocab = state['vocab']
+
         deg = 5
         uniq_act = 2
-        gen = words_gen(deg, uniq_act)
+        if processes is None:
+            gen = words_gen(deg, uniq_act)
+            total = total_words_volume(deg, uniq_act)
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                shards = pool.map(_words_shard, list(ACT),
+                                  [deg] * len(ACT), [uniq_act] * len(ACT))
+                gen = [pair for shard in shards for pair in shard]
+            total = len(gen)
         deg_7_words = dict()
         deg_5_words = dict()
-
-        for w, p in tqdm(gen, total=total_words_volume(deg, uniq_act)):
+        seen = set()
+
+        # Первая фаза быстрая и детерминированная, при возобновлении она
+        # просто считается заново.
+        for w, p in tqdm(gen, total=total):
+            # Слова с одинаковой перестановкой дают одинаковые коммутаторы,
+            # поэтому оставляем только первое из них.
+            if p in seen:
+                continue
+            seen.add(p)
             if p.deg() % 7 == 0:
                 deg_7_words[w] = p
             if p.deg() % 5 == 0:
                 deg_5_words[w] = p
 
-        log = []
-
-        t_pairs = len(deg_7_words) * len(deg_5_words)
-        for w1, w2 in tqdm(product(deg_7_words, deg_5_words), total=t_pairs):
-            p1 = deg_7_words[w1]
-            p2 = deg_5_words[w2]
-
-            q = (p1 * p2) ** 2
-            if q.len() == 3:
-                ws = w1 + w2 + w1 + w2
-                log.append(ws)
-                self.add(ws)
-
-            q = (p2 * p1) ** 2
-            if q.len() == 3:
-                ws = w2 + w1 + w2 + w1
-                log.append(ws)
-                self.add(ws)
-
-        addition_words = self.fill_unknown_triplets()
-        log += addition_words
-
+        log = None
         if log_file:
-            print("Start write log to file.")
-            with open(log_file, 'w') as f:
-                line = '\n'.join(log)
-                f.write(line)
+            resuming = (state['row'] or state['done']) and \
+                Path(log_file).exists()
+            log = open(log_file, 'r+b' if resuming else 'wb')
+            if resuming:
+                # Слова после контрольной точки будут найдены заново.
+                log.truncate(state['log_size'])
+                log.seek(state['log_size'])
+
+        def save(row: int, done: bool = False):
+            if log is not None:
+                log.flush()
+            if checkpoint is not None:
+                _write_checkpoint(checkpoint, {
+                    'row': row, 'done': done, 'vocab': self.vocab,
+                    'log_size': log.tell() if log is not None else 0,
+                })
+
+        try:
+            if state['done']:
+                return
+
+            keys_7 = list(deg_7_words)[state['row']:]
+            keys_5 = list(deg_5_words)
+            if processes is not None and checkpoint is None:
+                # Порций больше, чем процессов, чтобы процессы не
+                # простаивали в конце.
+                chunk_rows = max(1, -(-len(keys_7) // (4 * processes)))
+            else:
+                chunk_rows = checkpoint_every
+
+            row = state['row']
+            chunks = _commutator_chunks(keys_7, keys_5, chunk_rows,
+                                        batch_size, processes)
+            with tqdm(total=len(deg_7_words), initial=row) as progress:
+                for n_rows, vocab, words in chunks:
+                    self.merge(vocab)
+                    if log is not None:
+                        log.write(''.join(ws + '\n' for ws in words).encode())
+                    row += n_rows
+                    save(row)
+                    progress.update(n_rows)
+
+            addition_words = self.fill_unknown_triplets()
+            if log is not None:
+                log.write(''.join(ws + '\n'
+                                  for ws in addition_words).encode())
+            save(row, done=True)
+        finally:
+            if log is not None:
+                log.close()
 
-    def fill_unknown_triplets(self):
+    @classmethod
+    def resume(cls, checkpoint: Path, log_file=None,
+               batch_size: Optional[int] = None,
+               processes: Optional[int] = None,
+               checkpoint_every: int = 64) -> Cycle3Lexica:
+        """ Продолжить прерванный bruteforse с контрольной точки. """
+        if not Path(checkpoint).exists():
+            raise FileNotFoundError(f"Checkpoint {checkpoint} doesn't exist.")
+        lexica = cls()
+        lexica.bruteforse(log_file, batch_size, processes, checkpoint,
+                          checkpoint_every)
+        return lexica
+
+    def fill_unknown_triplets(self, rounds: Optional[int] = 1) -> List[str]:
         """Посчитать все произведения 3-циклов и те, что дают новые 3-циклы
-        добавить в словарь."""
+        добавить в словарь.
+
+        Произведение двух 3-циклов бывает 3-циклом, только если у них общие
+        две или три точки, поэтому триплеты раскладываются по корзинам точек
+        и перебираются только такие пары. Перестановка слова из лексики равна
+        своему 3-циклу, так что слова заново не перемножаются. Проход
+        повторяется rounds раз или, если rounds=None, пока лексика меняется.
+        Возвращает все полученные слова. """
 
         addition_words = []
-        for pair1, pair2 in product(self.vocab.items(), self.vocab.items()):
-            tr1, w1 = pair1
-            tr2, w2 = pair2
-
-            p1 = Permutation().apply_cycle(tr1)
-            p2 = Permutation().apply_cycle(tr2)
-
-            q = p1 * p2
-            if q.len() == 3:
-                wq = w1 + w2
-                addition_words.append(wq)
-        self.add(*addition_words)
+        n_round = 0
+        while rounds is None or n_round < rounds:
+            n_round += 1
+            items = list(self.vocab.items())
+            perms = [_DENSE_IDENTITY.apply_cycle(tr) for tr, _ in items]
+            buckets: dict[int, List[int]] = dict()
+            for i, (tr, _) in enumerate(items):
+                for x in tr:
+                    buckets.setdefault(x, []).append(i)
+
+            found = []
+            for i, (tr1, w1) in enumerate(items):
+                shared: dict[int, int] = dict()
+                for x in tr1:
+                    for j in buckets[x]:
+                        shared[j] = shared.get(j, 0) + 1
+
+                # Пары в том же порядке, что и product(vocab, vocab).
+                for j in sorted(j for j, k in shared.items() if k >= 2):
+                    q = perms[i] * perms[j]
+                    if q.len() == 3:
+                        found.append((q._cycle_tuple()[0], w1 + items[j][1]))
+
+            changed = False
+            for tr, ws in found:
+                triplet = self._standart_triplet(tr)
+                known = self.vocab.get(triplet)
+                if known is None or len(ws) < len(known):
+                    self.vocab[triplet] = ws
+                    changed = True
+            addition_words += [ws for _, ws in found]
+            if not changed:
+                break
+
         return addition_words
 
+    def search_shortest(self, max_depth: int,
+                        max_states: Optional[int] = None,
+                        spill_dir: Optional[Path] = None) -> List[str]:
+        """ Найти поиском в ширину кратчайшие слова для 3-циклов длины не
+        больше max_depth (rubik.search) и добавить их в лексику, если они
+        короче имеющихся. Возвращает найденные слова. """
+        from rubik.search import shortest_triplet_words
+
+        vocab = shortest_triplet_words(max_depth, max_states, spill_dir)
+        self.merge(vocab)
+        return list(vocab.values())
+
+    def search_triplet(self, triplet: Tuple[int, int, int],
+                       max_depth: int = 16,
+                       max_states: Optional[int] = None) -> Optional[str]:
+        """ Найти кратчайшее слово для одного триплета поиском навстречу
+        (rubik.search.bidirectional_search) и добавить его в лексику, если
+        оно короче имеющегося. Возвращает слово или None. """
+        from rubik.search import bidirectional_search
+
+        target = _DENSE_IDENTITY.apply_cycle(triplet)
+        ws = bidirectional_search(target, max_depth, max_states)
+        if ws is not None:
+            self.merge({self._standart_triplet(triplet): ws})
+        return ws
+
+    def complete_by_conjugation(
+        self,
+        setup_depth: int = 4,
+        seeds: Optional[dict[Tuple[int, int, int], str]] = None,
+    ) -> List[str]:
+        """ Достроить лексику сопряжениями s c s^-1 слов-затравок c со
+        всеми установочными словами s длины не больше setup_depth.
+
+        Сопряжение переводит 3-цикл (a b c) в (S^-1(a) S^-1(b) S^-1(c)), где S
+        перестановка слова s. Установочные слова перебираются один раз поиском
+        в ширину, поэтому для каждой перестановки берется кратчайшее слово, а
+        для S^-1 - кратчайшее найденное слово или inverse_word(s). Работа
+        линейна по числу установочных слов и затравок. Для каждого триплета,
+        в том числе отсутствующего в uncovered_triplets(), остается самое
+        короткое слово. По умолчанию затравками служит вся лексика. """
+        from rubik.search import BreadthFirstSearch
+
+        seeds = dict(self.vocab if seeds is None else seeds)
+        setups = {_DENSE_IDENTITY._img: ''}
+        for ws, p in BreadthFirstSearch().search(setup_depth):
+            setups[p._img] = ws
+
+        best: dict[Tuple[int, int, int], str] = dict()
+        for img, ws in setups.items():
+            s_inv = DensePermutation._from_images(img).inverse()
+            ws_inv = setups.get(s_inv._img, inverse_word(ws))
+            for (a, b, c), wc in seeds.items():
+                triplet = self._standart_triplet(
+                    (s_inv._img[a], s_inv._img[b], s_inv._img[c]))
+                new_ws = reduce_runs(ws + wc + ws_inv)
+                known = best.get(triplet)
+                if known is None or len(new_ws) < len(known):
+                    best[triplet] = new_ws
+
+        new_words = [ws for triplet, ws in best.items()
+                     if self.vocab.get(triplet) is None
+                     or len(ws) < len(self.vocab[triplet])]
+        self.merge(best)
+        return new_words
+
     def uncovered_triplets(self) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
         vertex = []
         for a, b, c in combinations(range(1, 8 + 1), 3):
             if (a, b, c) not in self.vocab:
                 vertex.append((a, b, c))
             if (a, c, b) not in self.vocab:
-                vertex.append((a, b, c))
+                vertex.append((a, c, b))
 
         edge = []
         for a, b, c in combinations(range(9, 20 + 1), 3):
             if (a, b, c) not in self.vocab:
                 edge.append((a, b, c))
             if (a, c, b) not in self.vocab:
-                edge.append((a, b, c))
+                edge.append((a, c, b))
 
         return vertex, edge
 
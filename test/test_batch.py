@@ -0,0 +1,87 @@
+from itertools import islice
+import pytest
+from rubik.permutation import DensePermutation
+from rubik.words import dense_word, words_gen
+from rubik.words import _commutator_words, _commutator_words_batch
+
+np = pytest.importorskip('numpy')
+from rubik.batch import PermutationBatch  # noqa: E402
+
+
+@pytest.fixture
+def perms():
+    return [p for _, p in words_gen(3, 2)][:40]
+
+
+def test_PermutationBatch_mul(perms):
+    a = PermutationBatch.from_permutations(perms)
+    b = PermutationBatch.from_permutations(perms[::-1])
+    ab = a * b
+    for i, (p, q) in enumerate(zip(perms, perms[::-1])):
+        assert ab[i] == p * q
+
+
+def test_PermutationBatch_inverse_pow(perms):
+    a = PermutationBatch.from_permutations(perms)
+    inv = a.inverse()
+    cube = a ** 3
+    for i, p in enumerate(perms):
+        assert inv[i] == p.inverse()
+        assert cube[i] == p ** 3
+    assert (a * inv).support().sum() == 0
+    assert ((a ** -2)[5]) == perms[5] ** -2
+
+
+def test_PermutationBatch_support(perms):
+    a = PermutationBatch.from_permutations(perms)
+    assert list(a.support()) == [p.len() for p in perms]
+
+
+def test_PermutationBatch_cross(perms):
+    a = PermutationBatch.from_permutations(perms[:7])
+    b = PermutationBatch.from_permutations(perms[7:12])
+    pairs = []
+    for i, j, ab in a.cross(b, chunk_size=4):
+        for k in range(len(ab)):
+            assert ab[k] == perms[i[k]] * perms[7 + j[k]]
+            pairs.append((i[k], j[k]))
+    assert pairs == [(i, j) for i in range(7) for j in range(5)]
+
+
+def test_PermutationBatch_from_permutations_sparse():
+    p = dense_word('OBY')
+    a = PermutationBatch.from_permutations([p.to_permutation()], n=p.n)
+    assert a[0] == p
+    assert PermutationBatch.identity(2, 5)[1] == DensePermutation(range(5))
+
+
+def test_PermutationBatch_invalid():
+    with pytest.raises(ValueError):
+        PermutationBatch([0, 1, 2])
+    with pytest.raises(ValueError):
+        PermutationBatch([[0, 1, 256]])
+    with pytest.raises(ValueError):
+        PermutationBatch([[0, 1, -1]])
+    with pytest.raises(ValueError):
+        PermutationBatch([[0, 1, 1]])
+    with pytest.raises(ValueError):
+        PermutationBatch([[0.0, 1.0]])
+    assert PermutationBatch([[1, 0, 2]])[0] == DensePermutation([1, 0, 2])
+
+    p = DensePermutation([1, 0, 2, 4, 3])
+    with pytest.raises(ValueError):
+        PermutationBatch.from_permutations([p], n=4)
+    q = DensePermutation([1, 0, 2, 3])
+    assert PermutationBatch.from_permutations([q], n=2)[0] == \
+        DensePermutation([1, 0])
+
+
+def test_commutator_words_batch():
+    words = dict(islice(words_gen(5, 2), 400))
+    words_a = {w: p for w, p in words.items() if p.deg() % 7 == 0}
+    words_b = {w: p for w, p in words.items() if p.deg() % 5 == 0}
+    expected = list(_commutator_words(words_a, words_b, progress=False))
+    assert len(expected) > 0
+    for batch_size in (1, 7, 1 << 16):
+        assert list(_commutator_words_batch(
+            words_a, words_b, batch_size, progress=False)) == expected
@@ -0,0 +1,54 @@
+from itertools import permutations, product
+from math import factorial, perm
+import pytest
+from rubik.coordinates import lehmer_rank, lehmer_unrank, orientation_rank
+from rubik.coordinates import orientation_unrank, partial_rank, partial_unrank
+from rubik.coordinates import subset_rank, subset_unrank
+
+
+def test_lehmer_rank_order():
+    ranks = [lehmer_rank(seq) for seq in permutations(range(5))]
+    assert ranks == list(range(factorial(5)))
+
+
+@pytest.mark.parametrize('n, rank', [(1, 0), (8, 0), (8, 40319), (12, 123456789)])
+def test_lehmer_unrank(n, rank):
+    seq = lehmer_unrank(rank, n)
+    assert sorted(seq) == list(range(n))
+    assert lehmer_rank(seq) == rank
+
+
+def test_lehmer_unrank_out_of_range():
+    with pytest.raises(ValueError):
+        lehmer_unrank(factorial(4), 4)
+
+
+@pytest.mark.parametrize('n, k', [(6, 2), (12, 4), (5, 5)])
+def test_partial_rank(n, k):
+    ranks = [partial_rank(seq, n) for seq in permutations(range(n), k)]
+    assert ranks == list(range(perm(n, k)))
+    assert partial_unrank(ranks[-1], n, k) == list(range(n - 1, n - 1 - k, -1))
+
+
+@pytest.mark.parametrize('n, base', [(8, 3), (12, 2)])
+def test_orientation_rank(n, base):
+    seen = set()
+    for ori in product(range(base), repeat=n):
+        if sum(ori) % base:
+            continue
+        rank = orientation_rank(ori, base)
+        assert orientation_unrank(rank, n, base) == list(ori)
+        seen.add(rank)
+    assert seen == set(range(base ** (n - 1)))
+
+
+@pytest.mark.parametrize('n, k, base', [(8, 2, 3), (6, 3, 2)])
+def test_subset_rank(n, k, base):
+    ranks = [subset_rank(seq, ori, n, base)
+             for seq in permutations(range(n), k)
+             for ori in product(range(base), repeat=k)]
+    assert ranks == list(range(perm(n, k) * base ** k))
+    assert subset_unrank(ranks[-1], n, k, base) == \
+        (list(range(n - 1, n - 1 - k, -1)), [base - 1] * k)
+    with pytest.raises(ValueError):
+        subset_unrank(len(ranks), n, k, base)
@@ -0,0 +1,119 @@
+import os
+import pickle
+import random
+
+import pytest
+from rubik.coloring import Color, rotate, turn
+from rubik.cubie import CORNERS, EDGES, MOVES, CubieState, stickers
+from rubik.representations import InvoluteRepresentation
+from rubik.state import Rubik
+from rubik.tables import MoveTable
+from rubik.words import word
+
+
+def random_word(n, seed):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('OBYWGR') for _ in range(n))
+
+
+@pytest.mark.parametrize('color', Color)
+def test_MOVES_permutation(color):
+    p = Rubik().act(color).permutation()
+    move = MOVES[color.name]
+    for j in range(8):
+        assert p.apply(j + 1) == move.corner_slot[j] + 1
+    for j in range(12):
+        assert p.apply(j + 9) == move.edge_slot[j] + 9
+
+
+@pytest.mark.parametrize('color', Color)
+def test_MOVES_orientation_additive(color):
+    move = MOVES[color.name]
+    for cells, slots, deltas, base in [
+            (CORNERS, move.corner_slot, move.corner_twist, 3),
+            (EDGES, move.edge_slot, move.edge_flip, 2)]:
+        assert sum(deltas) % base == 0
+        for j, cell in enumerate(cells):
+            target = cells[slots[j]]
+            for o, normal in enumerate(stickers(cell)):
+                if rotate(cell, color) != cell:
+                    normal = turn(normal, color)
+                assert stickers(target).index(normal) == (o + deltas[j]) % base
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_CubieState_apply(seed):
+    ws = random_word(25, seed)
+    state = CubieState().apply(ws)
+    assert state.permutation() == word(ws)
+    assert state.is_valid()
+
+    cube = Rubik()
+    cube.apply(ws)
+    assert CubieState.from_rubik(cube).permutation() == state.permutation()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_CubieState_group(seed):
+    a = CubieState().apply(random_word(20, seed))
+    b = CubieState().apply(random_word(20, seed + 100))
+    assert a * b == a.apply(random_word(20, seed + 100))
+    assert a * a.inverse() == CubieState()
+    assert (a * a.inverse()).is_solved()
+    assert CubieState().apply('OOOO') == CubieState()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_CubieState_from_involute(seed):
+    ws = random_word(30, seed)
+    rep = InvoluteRepresentation()
+    rep.apply(ws)
+    assert CubieState.from_involute(rep) == CubieState().apply(ws)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_CubieState_coloring(seed):
+    state = CubieState().apply(random_word(30, seed))
+    coloring = state.to_coloring()
+    assert CubieState.from_coloring(coloring, orientation=True) == state
+    assert CubieState.from_coloring(coloring).permutation() == \
+        state.permutation()
+    assert state.to_rubik().permutation() == state.permutation()
+
+
+def test_CubieState_load():
+    abs_path = os.path.dirname(__file__)
+    file = os.path.join(abs_path, 'state_300423.txt')
+    state = CubieState.load(file)
+    assert state.permutation() == Rubik.load(file).permutation()
+
+
+def test_CubieState_wrong_orientation():
+    coloring = CubieState().to_coloring()
+    coloring[(1, 1, 1)] = coloring[(1, 1, 1)][::-1]
+    with pytest.raises(ValueError):
+        CubieState.from_coloring(coloring, orientation=True)
+    assert not CubieState(corner_twist=[1] + [0] * 7).is_valid()
+
+
+@pytest.mark.parametrize('name', ['corner_twist', 'edge_flip', 'edge_perm_1',
+                                  'corner_subset_1', 'edge_subset_2'])
+def test_CubieState_coordinates(name):
+    table = MoveTable.build(name)
+    for seed in range(5):
+        ws = random_word(20, seed)
+        coords = CubieState().apply(ws).coordinates()
+        start = CubieState().coordinates()[name]
+        assert coords[name] == table.apply(start, ws)
+
+
+def test_CubieState_hash_pickle():
+    state = CubieState().apply('OBY')
+    assert hash(state) == hash(CubieState().apply('OBY'))
+    assert len({state, CubieState().apply('OBY'), CubieState()}) == 2
+    assert pickle.loads(pickle.dumps(state)) == state
+    with pytest.raises(AttributeError):
+        state._codes = b''
+    with pytest.raises(AttributeError):
+        del state._codes
+    assert state == CubieState().apply('OBY')
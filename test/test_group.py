@@ -0,0 +1,121 @@
+from random import Random
+import pytest
+from rubik.group import PermutationGroup, SiftSolver
+from rubik.permutation import DensePermutation, Permutation
+from rubik.representations import InvoluteRepresentation
+from rubik.words import ACT, DENSE_ACT, word
+
+
+@pytest.fixture(scope='module')
+def cube_group():
+    return PermutationGroup(ACT.values())
+
+
+@pytest.fixture(scope='module')
+def involute_group():
+    return PermutationGroup(InvoluteRepresentation._actions.values())
+
+
+def test_PermutationGroup_order_symmetric():
+    g = PermutationGroup([Permutation({1: 2, 2: 1}),
+                          Permutation().apply_cycle([1, 2, 3, 4, 5])])
+    assert g.order() == 120
+    assert PermutationGroup([Permutation()]).order() == 1
+
+
+def test_PermutationGroup_order_cube(cube_group, involute_group):
+    assert cube_group.order() == 40320 * 479001600 // 2
+    assert involute_group.order() == 43252003274489856000
+
+
+def test_PermutationGroup_contains(cube_group):
+    assert word('OBYWGROOB') in cube_group
+    assert DENSE_ACT['R'] in cube_group
+    assert Permutation({1: 2, 2: 1, 9: 10, 10: 9}) in cube_group
+    # Одиночная транспозиция углов нечетна, такой стейт не собирается.
+    assert Permutation({1: 2, 2: 1}) not in cube_group
+    assert Permutation({1: 30, 30: 1}) not in cube_group
+
+
+def test_PermutationGroup_contains_involute(involute_group):
+    cube = InvoluteRepresentation()
+    cube.apply('obywgrrgb')
+    assert cube.permutation() in involute_group
+
+    # Повернутый на месте угол.
+    twisted = Permutation().apply_cycle(('B3', 'O9', 'Y3'))
+    assert twisted not in involute_group
+
+
+def test_PermutationGroup_random_element(cube_group):
+    rng = Random(7)
+    elements = [cube_group.random_element(rng) for _ in range(20)]
+    assert all(p in cube_group for p in elements)
+    assert len(set(elements)) == 20
+
+
+def test_PermutationGroup_dense_domain():
+    g = PermutationGroup([DensePermutation([1, 2, 0, 3]),
+                          DensePermutation([0, 1, 3, 2])])
+    assert g.degree == 4
+    assert g.order() == 24
+    assert len(g.base) == 3
+
+
+@pytest.fixture(scope='module')
+def sift_solver(cube_group):
+    return SiftSolver(ACT, group=cube_group)
+
+
+def test_SiftSolver_tables_complete(sift_solver, cube_group):
+    for words, transversal in zip(sift_solver._words,
+                                  cube_group._transversal):
+        assert words.keys() == transversal.keys()
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_SiftSolver_word(seed, sift_solver, cube_group):
+    p = cube_group.random_element(Random(seed))
+    ws = sift_solver.word(p)
+    assert word(ws) == p
+
+
+def test_SiftSolver_word_not_in_group(sift_solver):
+    with pytest.raises(ValueError):
+        sift_solver.word(Permutation({1: 2, 2: 1}))
+
+
+def test_SiftSolver_orders():
+    # Образующие порядков 2 и 5: обратные и сокращения не по модулю 4.
+    actions = {'A': Permutation({0: 1, 1: 0}),
+               'B': Permutation({0: 1, 1: 2, 2: 3, 3: 4, 4: 0})}
+    solver = SiftSolver(actions)
+    assert solver.group.order() == 120
+    p = Permutation({0: 2, 2: 0})
+    ws = solver.word(p)
+    assert solver.group.to_permutation(solver._dense(ws)) == p
+    assert 'AA' not in ws and 'BBBBB' not in ws
+    for seed in range(10):
+        p = solver.group.random_element(Random(seed))
+        ws = solver.word(p)
+        assert solver.group.to_permutation(solver._dense(ws)) == p
+
+    with pytest.raises(ValueError):
+        SiftSolver({'AB': Permutation({0: 1, 1: 0})})
+
+
+def test_SiftSolver_shallow_bfs(cube_group):
+    # Произведения представителей одного уровня тут не заполняют таблицы.
+    actions = {'A': Permutation({0: 2, 2: 3, 3: 8, 8: 0}),
+               'B': Permutation({8: 4, 4: 2, 2: 3, 3: 8})}
+    solver = SiftSolver(actions, bfs_depth=2)
+    assert solver._complete()
+    for seed in range(10):
+        p = solver.group.random_element(Random(seed))
+        ws = solver.word(p)
+        assert solver.group.to_permutation(solver._dense(ws)) == p
+
+    solver = SiftSolver(ACT, group=cube_group, bfs_depth=1)
+    assert solver._complete()
+    p = cube_group.random_element(Random(0))
+    assert word(solver.word(p)) == p
@@ -0,0 +1,216 @@
+import os
+import threading
+
+import pytest
+from rubik.lexica import CompiledLexica, compile_lexica, compile_text, main
+from rubik.lexica import CandidateLexica, LexicaRegistry
+from rubik.lexica import get_candidate_lexica, get_lexica, lexica_dir
+from rubik.words import Cycle3Lexica, dense_word, normalize_word
+
+LEXICA = os.path.join(os.path.dirname(__file__), '..', 'lexica', '3dim_full')
+
+
+@pytest.fixture(scope='module')
+def lexica():
+    return Cycle3Lexica.load(LEXICA)
+
+
+def test_compile_lexica(tmp_path, lexica):
+    path = tmp_path / 'lexica.bin'
+    digest = compile_lexica(lexica, path)
+    compiled = CompiledLexica(path)
+
+    assert compiled.digest == digest
+    assert compiled.verify()
+    assert len(compiled) == len(lexica.vocab)
+    assert compiled.vocab == lexica.vocab
+    for tr, ws in list(lexica.vocab.items())[::25]:
+        # Сдвиг триплета задает тот же 3-цикл и находит то же слово.
+        for rotated in [(tr[1], tr[2], tr[0]), (tr[2], tr[0], tr[1])]:
+            assert compiled.get(rotated) == ws == lexica.get(rotated)
+            cycles = dense_word(compiled.get(rotated)).cycles()
+            assert Cycle3Lexica._standart_triplet(cycles[0]) == \
+                Cycle3Lexica._standart_triplet(rotated)
+        reverse = (tr[0], tr[2], tr[1])
+        assert compiled.get(reverse) == lexica.get(reverse) != ws
+        assert tr in compiled
+    assert compiled.get((1, 2, 30)) is None
+    assert compiled.to_lexica().vocab == lexica.vocab
+
+
+def test_compile_lexica_empty(tmp_path):
+    path = tmp_path / 'empty.bin'
+    compile_lexica(Cycle3Lexica(), path)
+    compiled = CompiledLexica(path)
+    assert len(compiled) == 0
+    assert compiled.get((1, 2, 3)) is None
+
+
+def test_CompiledLexica_verify(tmp_path, lexica):
+    path = tmp_path / 'lexica.bin'
+    compile_lexica(lexica, path)
+    data = bytearray(path.read_bytes())
+    data[-1] = ord('O') if data[-1] != ord('O') else ord('B')
+    path.write_bytes(bytes(data))
+    assert not CompiledLexica(path).verify()
+
+    path.write_bytes(b'not a lexica file at all' * 4)
+    with pytest.raises(ValueError):
+        CompiledLexica(path)
+
+
+def test_compile_command(tmp_path, lexica):
+    main(['compile', LEXICA, '-o', str(tmp_path)])
+    compiled = CompiledLexica(tmp_path / '3dim_full.bin')
+    assert compiled.vocab == lexica.vocab
+
+    target = compile_text(LEXICA, tmp_path / 'other.bin')
+    assert CompiledLexica(target).digest == compiled.digest
+
+
+def test_LexicaRegistry(tmp_path, monkeypatch, lexica):
+    registry = LexicaRegistry(tmp_path)
+    path = tmp_path / 'words'
+    path.write_text('\n'.join(list(lexica.vocab.values())[:10]))
+
+    loads = []
+    load = Cycle3Lexica.load.__func__
+
+    def counting_load(cls, p):
+        loads.append(p)
+        return load(cls, p)
+
+    monkeypatch.setattr(Cycle3Lexica, 'load', classmethod(counting_load))
+
+    first = registry.get('words')
+    assert len(first.vocab) == 10
+    assert registry.get(path).vocab == first.vocab
+    assert len(loads) == 1
+
+    # Время изменения поменялось, содержимое нет.
+    os.utime(path, ns=(0, 10 ** 9))
+    assert registry.get('words').vocab == first.vocab
+    assert len(loads) == 1
+
+    path.write_text('\n'.join(list(lexica.vocab.values())[:20]))
+    os.utime(path, ns=(0, 2 * 10 ** 9))
+    second = registry.get('words')
+    assert len(loads) == 2
+    assert len(second.vocab) == 20
+
+    compile_lexica(second, tmp_path / 'words.bin')
+    compiled = registry.get('words.bin')
+    assert isinstance(compiled, CompiledLexica)
+    assert registry.get('words.bin') is compiled
+
+    with pytest.raises(FileNotFoundError):
+        registry.get('missing')
+
+
+def test_LexicaRegistry_close(tmp_path, lexica):
+    registry = LexicaRegistry(tmp_path)
+    path = tmp_path / 'words.bin'
+    compile_lexica(lexica, path)
+    first = registry.get('words.bin')
+    assert len(first) == len(lexica.vocab)
+
+    small = Cycle3Lexica()
+    small.merge(dict(list(lexica.vocab.items())[:10]))
+    compile_lexica(small, path)
+    os.utime(path, ns=(0, 10 ** 9))
+    second = registry.get('words.bin')
+    assert len(second) == 10
+    # Полученная раньше версия продолжает работать.
+    assert first.vocab == lexica.vocab
+
+    registry.clear()
+    assert second.vocab == small.vocab
+    assert first.vocab == lexica.vocab
+    assert registry.get('words.bin') is not second
+
+
+def test_lexica_dir(tmp_path, monkeypatch, lexica):
+    monkeypatch.delenv('RUBIK_LEXICA', raising=False)
+    assert (lexica_dir() / '3dim_full').exists()
+
+    monkeypatch.setenv('RUBIK_LEXICA', str(tmp_path))
+    assert lexica_dir() == tmp_path
+    (tmp_path / 'words').write_text('\n'.join(list(lexica.vocab.values())[:5]))
+    registry = LexicaRegistry()
+    assert registry.directory == tmp_path
+    assert len(registry.get('words').vocab) == 5
+    with pytest.raises(FileNotFoundError):
+        registry.get('3dim_full')
+
+
+def test_get_lexica_shared(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_lexica()))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 4
+    assert all(x.vocab == results[0].vocab for x in results)
+    assert len(results[0].vocab) > 0
+
+    # Каждый получает свою копию: изменения не видны остальным.
+    results[0].vocab.clear()
+    assert len(results[1].vocab) > 0
+    assert get_lexica('3dim_full').vocab == results[1].vocab
+
+
+def test_CandidateLexica(lexica):
+    candidates = CandidateLexica.from_lexica(lexica, top_k=3)
+    assert set(candidates.words) == set(lexica.vocab)
+    for tr, words in list(candidates.words.items())[::10]:
+        assert 0 < len(words) <= 3
+        assert [len(w) for w in words] == sorted(len(w) for w in words)
+        assert len(words[0]) <= len(lexica.vocab[tr])
+        assert candidates.get(tr[1:] + tr[:1]) == words[0]
+        for ws in words:
+            cycles = dense_word(ws).cycles()
+            assert Cycle3Lexica._standart_triplet(cycles[0]) == tr
+
+    plain = CandidateLexica.from_lexica(lexica, variants=False)
+    assert all(len(words) == 1 for words in plain.words.values())
+    assert plain.vocab == {tr: normalize_word(ws)
+                           for tr, ws in lexica.vocab.items()}
+
+
+def test_CandidateLexica_add():
+    candidates = CandidateLexica(top_k=2)
+    ws = 'OOBOYOOBBBOOBOYOOBBB'
+    candidates.add(ws)
+    candidates.add(ws)
+    candidates.add(ws[1:] + ws[:1] + ws[1:] + ws[:1], (9, 20, 16))
+    assert len(candidates.candidates((9, 20, 16))) == 2
+    with pytest.raises(ValueError):
+        candidates.add('OB')
+
+
+def test_get_candidate_lexica():
+    candidates = get_candidate_lexica()
+    assert get_candidate_lexica() is candidates
+    assert len(candidates.words) == len(get_lexica().vocab)
+
+
+def test_LexicaRegistry_candidates(tmp_path, lexica):
+    registry = LexicaRegistry(tmp_path)
+    path = tmp_path / 'words'
+    path.write_text('\n'.join(list(lexica.vocab.values())[:10]))
+
+    first = registry.candidates('words', top_k=2)
+    assert registry.candidates('words', top_k=2) is first
+    assert registry.candidates('words', top_k=3) is not first
+
+    path.write_text('\n'.join(list(lexica.vocab.values())[:20]))
+    os.utime(path, ns=(0, 2 * 10 ** 9))
+    second = registry.candidates('words', top_k=2)
+    assert second is not first
+    assert set(registry.get('words').vocab) <= set(second.words)
+    assert len(registry.get('words').vocab) == 20
+    # Варианты прежней версии файла удалены из кеша.
+    assert len(registry._candidates) == 1
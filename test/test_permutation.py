@@ -1,4 +1,4 @@
-from rubik.permutation import Permutation#, RubikSmallGroup
+from rubik.permutation import DensePermutation, Permutation#, RubikSmallGroup
 import pytest
 
 
@@ -70,6 +70,129 @@ def test_permutation_cycle():
     assert cycle[1] == [5, 6]
 
 
+def test_DensePermutation_mul():
+    p = DensePermutation([0, 2, 3, 4, 1])
+    q = DensePermutation([0, 3, 4, 2, 1])
+    pq = p * q
+
+    assert pq.apply(1) == 4
+    assert pq.apply(2) == 2
+    assert pq.apply(3) == 1
+    assert pq.apply(4) == 3
+    assert pq.len() == 3
+    assert pq.to_permutation() == p.to_permutation() * q.to_permutation()
+
+
+def test_DensePermutation_from_permutation():
+    p = Permutation().apply_cycle([1, 3, 2, 4]).apply_cycle([5, 6])
+    q = DensePermutation.from_permutation(p, 10)
+
+    assert q.n == 10
+    assert q.to_permutation() == p
+    assert q.cycles() == [[1, 3, 2, 4], [5, 6]]
+    assert q.deg() == 4
+    assert q.swaps() == p.swaps()
+    assert str(q) == '(1 3 2 4) (5 6)'
+
+
+def test_DensePermutation_inverse_pow():
+    p = DensePermutation().apply_cycle([1, 3, 2, 4], [7, 6, 5])
+    e = DensePermutation(range(8))
+
+    assert p * p.inverse() == e
+    assert p / p == e
+    assert p ** 12 == e
+    assert p ** -1 == p.inverse()
+    assert p ** 5 == p * p * p * p * p
+
+
+def test_DensePermutation_not_permutation():
+    with pytest.raises(ValueError):
+        DensePermutation([0, 1, 1])
+
+
+def test_permutation___hash__():
+    p = Permutation({1: 2, 2: 1})
+    q = Permutation().apply_cycle([2, 1])
+
+    assert hash(p) == hash(q)
+    assert len({p, q, Permutation()}) == 2
+
+
+def test_DensePermutation_hash_intern():
+    p = DensePermutation([0, 2, 1])
+    q = DensePermutation([0, 2, 1, 3])
+    r = DensePermutation([1, 0])
+
+    assert p == q
+    assert len({p, q, r}) == 2
+    assert p.intern() is DensePermutation([0, 2, 1]).intern()
+    assert p.intern() is not q.intern()
+    assert r.intern() is not p.intern()
+
+    # Равные перестановки разных степеней интернируются отдельно.
+    assert DensePermutation([0, 1, 2]).intern().n == 3
+    assert DensePermutation(range(8)).intern().n == 8
+
+
+def test_DensePermutation_immutable():
+    p = DensePermutation([0, 2, 1])
+    with pytest.raises(AttributeError):
+        p.n = 5
+
+
+def test_DensePermutation_pickle():
+    import pickle
+
+    p = DensePermutation([3, 0, 2, 1])
+    q = pickle.loads(pickle.dumps(p))
+    assert q == p
+    assert q.n == 4
+
+
+def test_DensePermutation_invariants():
+    p = DensePermutation().apply_cycle([1, 3, 2, 4], [5, 6], [7, 8, 9])
+
+    assert p.cycle_type() == (4, 3, 2)
+    assert p.deg() == 12
+    assert p.len() == 9
+    assert p.sign() == 1
+    assert p.apply_cycle([1, 2]).sign() == -1
+    assert DensePermutation(range(4)).cycle_type() == ()
+    assert DensePermutation(range(4)).deg() == 1
+    assert p.cycles() is not p.cycles()
+
+
+@pytest.mark.parametrize('k', [-7, -2, -1, 0, 1, 2, 3, 5, 12, 100])
+def test_permutation___pow__(k):
+    p = Permutation().apply_cycle([1, 3, 2, 4], [5, 6], [7, 8, 9])
+    d = DensePermutation.from_permutation(p)
+
+    ans = Permutation()
+    base = p if k >= 0 else p.inverse()
+    for _ in range(abs(k)):
+        ans = ans * base
+
+    assert p ** k == ans
+    assert (d ** k).to_permutation() == ans
+    d.cycles()
+    assert (d ** k).to_permutation() == ans
+
+
+def test_permutation_rank():
+    points = ['a', 'b', 'c', 'd']
+    p = Permutation({'a': 'b', 'b': 'a'})
+    assert Permutation().rank(points) == 0
+    assert p.rank(points) == 6
+    assert Permutation.unrank(6, points) == p
+    with pytest.raises(ValueError):
+        Permutation({'a': 'e', 'e': 'a'}).rank(points)
+
+    d = DensePermutation([1, 0, 2, 3])
+    assert d.rank() == 6
+    assert DensePermutation.unrank(6, 4) == d
+
+
 # swaps = [
 #     ((1, 3), (2, 4)),
 #     ((2, 3), (2, 4)),
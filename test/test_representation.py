@@ -215,6 +215,18 @@ def test_InvoluteRepresentation_apply(word, db_states):
     assert p == q
 
 
+@pytest.mark.parametrize('word', ['', 'b', 'bo', 'bow'])
+def test_InvoluteRepresentation_loads(word, db_states):
+    path = db_states / f'state_{word}.txt'
+    st = InvoluteRepresentation.loads(path.read_text())
+    assert st.permutation() == InvoluteRepresentation.load(path).permutation()
+
+    # Строки развертки state2tab записаны через пробел.
+    text = '\n'.join(['BYO'] + st.state2tab())
+    assert InvoluteRepresentation.loads(text).permutation() == \
+        st.permutation()
+
+
 @pytest.mark.parametrize('left, right', [
             ('', 'b'),
             ('b', 'bo'),
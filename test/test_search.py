@@ -0,0 +1,159 @@
+import os
+import random
+
+import pytest
+from rubik.cubie import CubieState
+from rubik.permutation import DensePermutation, Permutation
+from rubik.search import PERMUTATION_COORDINATES, BreadthFirstSearch, IDAStar
+from rubik.search import bidirectional_search, shortest_triplet_words
+from rubik.words import Cycle3Lexica, dense_word, words_gen
+
+
+def dense(*cycles):
+    return DensePermutation.from_permutation(
+        Permutation().apply_cycle(*cycles), 21)
+
+
+@pytest.mark.parametrize('depth', [1, 3, 5])
+def test_BreadthFirstSearch_shortest(depth):
+    found = list(BreadthFirstSearch().search(depth))
+    assert all(dense_word(w) == p for w, p in found)
+
+    shortest = dict()
+    for n in range(depth + 1):
+        for _, p in words_gen(n, 0):
+            shortest.setdefault(p, n)
+    del shortest[dense_word('')]
+    assert {p: len(w) for w, p in found} == shortest
+
+
+def test_BreadthFirstSearch_spill(tmp_path):
+    found = list(BreadthFirstSearch().search(5))
+    bfs = BreadthFirstSearch(spill_dir=tmp_path, spill_threshold=50)
+    assert list(bfs.search(5)) == found
+    assert os.listdir(tmp_path) == []
+
+    search = bfs.search(5)
+    for _ in range(300):
+        next(search)
+    assert os.listdir(tmp_path) != []
+    search.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_BreadthFirstSearch_max_states():
+    bfs = BreadthFirstSearch(max_states=100)
+    found = list(bfs.search(6))
+    assert bfs.truncated
+    assert len(found) == 99
+
+
+def test_shortest_triplet_words():
+    actions = {'A': dense((1, 2, 3)), 'B': dense((3, 4, 5, 6))}
+    vocab = shortest_triplet_words(8, actions=actions)
+    assert vocab[(1, 2, 3)] == 'A'
+    assert vocab[(1, 3, 2)] == 'AA'
+    for triplet, ws in vocab.items():
+        p = DensePermutation(range(21))
+        for w in ws:
+            p = p * actions[w]
+        assert p == dense(triplet)
+
+
+def test_Cycle3Lexica_search_shortest():
+    cl = Cycle3Lexica()
+    cl.add('OOBOYOOBBBOOBOYOOBBB')
+    assert cl.search_shortest(4) == []
+    assert len(cl.vocab) == 1
+
+
+@pytest.mark.parametrize('ws', ['OBYW', 'OOBOYOGRWO', 'GGRWYYBO'])
+def test_bidirectional_search(ws):
+    found = bidirectional_search(dense_word(ws), len(ws))
+    assert dense_word(found) == dense_word(ws)
+    assert len(found) <= len(ws)
+    assert bidirectional_search(dense_word(ws), 2) is None or len(ws) <= 2
+
+
+def test_bidirectional_search_shortest():
+    actions = {'A': dense((1, 2, 3)), 'B': dense((3, 4, 5, 6))}
+    vocab = shortest_triplet_words(8, actions=actions)
+    for triplet, ws in vocab.items():
+        found = bidirectional_search(dense(triplet), 8, actions=actions)
+        assert len(found) == len(ws)
+
+
+def test_Cycle3Lexica_search_triplet():
+    cl = Cycle3Lexica()
+    ws = 'OOBOYOOBBBOOBOYOOBBB'
+    cl.add(ws)
+    triplet = dense_word(ws).cycles()[0]
+    found = cl.search_triplet(tuple(triplet), 14)
+    assert dense_word(found) == dense_word(ws)
+    assert cl.get(tuple(triplet)) == found
+    assert len(found) < len(ws)
+    assert cl.search_triplet(tuple(triplet), 14, max_states=100) is None
+
+
+@pytest.fixture(scope='module')
+def tables_directory(tmp_path_factory):
+    return tmp_path_factory.mktemp('tables')
+
+
+@pytest.fixture(scope='module')
+def ida(tables_directory):
+    return IDAStar(directory=tables_directory)
+
+
+@pytest.fixture(scope='module')
+def ida_permutation(tables_directory):
+    return IDAStar(PERMUTATION_COORDINATES, tables_directory)
+
+
+def random_word(n, seed):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('OBYWGR') for _ in range(n))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_IDAStar(seed, ida):
+    scramble = random_word(2 + seed * 2, seed)
+    state = CubieState().apply(scramble)
+    ws = ida.search(state)
+    assert ida.optimal
+    assert CubieState().apply(ws) == state
+    assert len(ws) <= len(scramble)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_IDAStar_permutation(seed, ida_permutation):
+    # Кратчайшее слово по положениям кубиков той же длины, что и у поиска
+    # навстречу по перестановкам.
+    scramble = random_word(2 + seed * 2, seed)
+    state = CubieState().apply(scramble)
+    ws = ida_permutation.search(state)
+    assert dense_word(ws) == dense_word(scramble)
+    shortest = bidirectional_search(dense_word(scramble), len(scramble))
+    assert len(ws) == len(shortest)
+
+
+def test_IDAStar_budget(ida):
+    scramble = 'OBYWGR' * 5
+    state = CubieState().apply(scramble)
+    assert ida.search(state, time_budget=0.01, best=scramble) == scramble
+    assert not ida.optimal
+    assert ida.search(state, max_depth=3) is None
+    assert ida.search(CubieState().apply('OBY'), best='OBY') == 'OBY'
+    assert ida.optimal
+    state = CubieState().apply('OBYWGR')
+    assert ida.search(state, max_depth=2, best='OBYWGR') == 'OBYWGR'
+    assert not ida.optimal
+    assert ida.search(state, best='OBYWGR') == 'OBYWGR'
+    assert ida.optimal
+
+
+def test_IDAStar_shorten(ida):
+    ws = 'OBYWGR' * 2 + 'RRRGGGWWWYYYBBBOOO'
+    res = ida.shorten(ws, window=10)
+    assert CubieState().apply(res) == CubieState().apply(ws)
+    assert len(res) < len(ws)
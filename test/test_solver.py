@@ -1,6 +1,15 @@
+import json
+import os
 import pytest
+from pathlib import Path
+from rubik.cubie import CubieState
 from rubik.permutation import Permutation
+from rubik.representations import InvoluteRepresentation
 from rubik.solver import Puzzle, permutation_triplets, separate_swaps, swaps_to_triplets
+from rubik.solver import assemble_word, cycle_triplets, triplet_alternatives
+from rubik.solver import main, parse_state, read_states, solve_many
+from rubik.solver import solve_permutation
+from rubik.lexica import CandidateLexica, get_candidate_lexica, get_lexica
 from random import choice, randint
 
 from rubik.words import ACT, word
@@ -55,6 +64,53 @@ def test_permutation_triplets(n_times, permutation):
     assert p == res
 
 
+@pytest.mark.parametrize('cycles, count', [
+    ([[1, 2, 3]], 1),
+    ([[1, 2, 3, 4, 5]], 2),
+    ([[1, 2], [3, 4]], 2),
+    ([[1, 2, 3, 4], [5, 6]], 3),
+    ([[1, 2, 3, 4, 5, 6, 7], [8, 9, 10]], 4),
+    ([[9, 10, 11, 12], [13, 14, 15, 16], [17, 18, 19]], 5),
+])
+def test_cycle_triplets(cycles, count):
+    p = Permutation().apply_cycle(*cycles)
+    triplets = cycle_triplets(cycles)
+    assert len(triplets) == count
+
+    res = Permutation()
+    for tr in triplets:
+        res = res.apply_cycle(tr)
+    assert p == res
+
+
+@pytest.mark.parametrize('n_times', range(20))
+def test_permutation_triplets_minimal(n_times, permutation):
+    _, q = permutation
+    p = q ** 2
+    moved = sum(len(c) for c in p.cycles())
+    odd = sum(1 for c in p.cycles() if len(c) % 2)
+    assert len(permutation_triplets(p)) == (moved - odd) // 2
+
+
+def test_triplet_alternatives():
+    parts = triplet_alternatives([[1, 2, 3, 4, 5], [6, 7], [8, 9, 10, 11]])
+    assert [len(alternatives) for alternatives in parts] == [5, 8]
+    for alternatives in parts:
+        assert len(set(len(triplets) for triplets in alternatives)) == 1
+
+
+@pytest.mark.parametrize('n_times', range(10))
+def test_assemble_word(n_times, permutation):
+    _, q = permutation
+    p = q ** 2
+    plain = CandidateLexica.from_lexica(get_lexica(), variants=False)
+    for lexica in (plain, get_candidate_lexica()):
+        assert word(assemble_word(p, lexica)) == p
+    with pytest.raises(TypeError):
+        assemble_word(p, get_lexica())
+    assert word(solve_permutation(p, get_lexica())) == p
+
+
 @pytest.mark.parametrize('n_times', range(100))
 def test_even(n_times, permutation):
     w, p = permutation
@@ -69,3 +125,111 @@ def test_Puzzle_word(n_times, permutation):
     new_ws = rubik.word()
     q = word(new_ws)
     assert p == q
+
+
+def test_Puzzle_word_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rubik = Puzzle()
+    rubik.apply('OBYWGR')
+    assert word(rubik.word()) == word('OBYWGR')
+
+
+@pytest.mark.parametrize('n_times', range(10))
+def test_Puzzle_sift_word(n_times, permutation):
+    ws, p = permutation
+    rubik = Puzzle()
+    rubik.apply(ws)
+    q = word(rubik.sift_word())
+    assert p == q
+
+
+STATE_FILE = Path(os.path.dirname(__file__)) / 'state_300423.txt'
+
+
+def involute_text(ws):
+    rep = InvoluteRepresentation()
+    rep.apply(ws)
+    return '\n'.join(['BYO'] + rep.state2tab())
+
+
+def test_parse_state():
+    assert parse_state(STATE_FILE.read_text()) == \
+        Puzzle.load(STATE_FILE).permutation()
+    assert parse_state(involute_text('OBYWGRRB')) == word('OBYWGRRB')
+    with pytest.raises(ValueError):
+        parse_state(STATE_FILE.read_text(), 'facelets')
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_solve_many(processes):
+    words = ['OBY', 'GGRW', 'YOBWRG' * 3, 'B', 'WRWRWR']
+    states = [CubieState().apply(ws) for ws in words]
+    states[1] = states[1].to_rubik()
+    states[2] = word(words[2])
+    res = list(solve_many(states, processes=processes, chunksize=2))
+    assert [word(ws) for ws in res] == [word(ws) for ws in words]
+
+
+def test_main(tmp_path, capsys):
+    states = tmp_path / 'states'
+    states.mkdir()
+    (states / 'a.txt').write_text(STATE_FILE.read_text())
+    (states / 'b.txt').write_text(involute_text('GRB'))
+    records = tmp_path / 'states.jsonl'
+    with open(records, 'w') as f:
+        f.write(json.dumps({'id': 'x', 'state': involute_text('OO')}) + '\n')
+        f.write('\n')
+        f.write(json.dumps({'state': 'nonsense', 'format': 'rubik'}) + '\n')
+
+    ids = [r['id'] for r in read_states([states, records])]
+    assert ids == [str(states / 'a.txt'), str(states / 'b.txt'), 'x',
+                   f'{records}:3']
+
+    main([str(states), str(records), '-j', '1'])
+    results = [json.loads(line) for line in
+               capsys.readouterr().out.splitlines()]
+    assert [r['id'] for r in results] == ids
+    assert word(results[0]['word']) == Puzzle.load(STATE_FILE).permutation()
+    assert word(results[1]['word']) == word('GRB')
+    assert word(results[2]['word']) == word('OO')
+    assert results[2]['length'] == len(results[2]['word'])
+    assert 'error' in results[3]
+
+
+def test_main_malformed(tmp_path, capsys):
+    records = tmp_path / 'states.jsonl'
+    with open(records, 'w') as f:
+        f.write(json.dumps({'id': 'ok', 'state': involute_text('OB')}) + '\n')
+        f.write('not json\n')
+        f.write(json.dumps({'id': 'int', 'state': 5}) + '\n')
+        f.write(json.dumps([1, 2]) + '\n')
+        f.write(json.dumps({'id': 'none'}) + '\n')
+
+    main([str(records), '-j', '1'])
+    results = [json.loads(line) for line in
+               capsys.readouterr().out.splitlines()]
+    assert [r['id'] for r in results] == \
+        ['ok', f'{records}:2', 'int', f'{records}:4', 'none']
+    assert word(results[0]['word']) == word('OB')
+    assert results[1]['error'].startswith('JSONDecodeError')
+    assert results[2]['error'].startswith('TypeError')
+    assert 'JSON object' in results[3]['error']
+    assert results[4]['error'].startswith('TypeError')
+
+
+def test_Puzzle_optimal_word(tmp_path, monkeypatch):
+    monkeypatch.setenv('RUBIK_TABLES', str(tmp_path))
+    rubik = Puzzle()
+    rubik.apply('OBYWGRR')
+    ws = rubik.optimal_word()
+    assert word(ws) == word('OBYWGRR')
+    assert len(ws) <= 7
+
+    rubik.apply('GWBRYO' * 5)
+    ws = rubik.optimal_word(0.5)
+    assert word(ws) == rubik.permutation()
+    assert len(ws) <= len(rubik.word())
+    assert list(tmp_path.glob('*.pdb.*'))
+
+    with pytest.raises(ValueError):
+        rubik.optimal_word(None)
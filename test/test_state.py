@@ -24,6 +24,14 @@ def test_Rubik_read():
     assert state.coloring[Vector(1, 1, 1)] == Vector(-1, 1, 1)
 
 
+def test_Rubik_loads():
+    file = Path(os.path.dirname(__file__)) / 'state_300423.txt'
+    state = Rubik.loads(file.read_text())
+    assert state.permutation() == Rubik.load(file).permutation()
+    assert Rubik.loads('\n' + file.read_text() + '\n\n').permutation() == \
+        state.permutation()
+
+
 def test_Rubik_permutation():
     p = Permutation().apply_cycle([1, 2, 8]).apply_cycle([9, 10, 11, 14])
     cell = Rubik().cells
@@ -65,6 +73,23 @@ def test_Rubik_apply(n_times, permutation):
     assert p == q
 
 
+@pytest.mark.parametrize('n_times', range(5))
+def test_Rubik_coordinates(n_times, permutation):
+    ws, p = permutation
+    cube = Rubik()
+    cube.apply(ws)
+    corners, edges = cube.coordinates()
+    assert 0 <= corners < 40320
+    assert 0 <= edges < 479001600
+
+    q = Rubik.from_coordinates(corners, edges).permutation()
+    assert p == q
+
+
+def test_Rubik_coordinates_solved():
+    assert Rubik().coordinates() == (0, 0)
+
+
 # def test_Rubik_word():
 #     pass
 
@@ -0,0 +1,116 @@
+import random
+import pytest
+from rubik.coordinates import partial_rank
+from rubik.cubie import MOVES, CubieState
+from rubik.state import Rubik
+from rubik.tables import COORDINATES, EDGE_SUBSETS, MOVE_ORDER, MoveTable
+from rubik.tables import move_table, pattern_table
+
+
+def release(*tables):
+    # Таблицы из временных каталогов закрываются и убираются из кеша.
+    for table in tables:
+        table.close()
+    move_table.cache_clear()
+
+
+@pytest.fixture(scope='module')
+def tables(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('tables')
+    tables = {name: move_table(name, directory) for name in COORDINATES}
+    yield tables
+    release(*tables.values())
+
+
+@pytest.fixture
+def scramble(seed):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('OBYGWR') for _ in range(rng.randint(2, 20)))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_MoveTable_permutation(seed, scramble, tables):
+    cube = Rubik()
+    cube.apply(scramble)
+    corners, _ = cube.coordinates()
+    assert tables['corner_perm'].apply(0, scramble) == corners
+
+    p = cube.permutation()
+    for i, subset in enumerate(EDGE_SUBSETS):
+        slots = [p.apply(9 + e) - 9 for e in subset]
+        start = partial_rank(list(subset), 12)
+        table = tables[f'edge_perm_{i}']
+        assert table.apply(start, scramble) == partial_rank(slots, 12)
+
+
+@pytest.mark.parametrize('name', list(COORDINATES))
+def test_MoveTable_relations(name, tables):
+    table = tables[name]
+    for c in range(0, table.size, 97):
+        for w in 'OBYGWR':
+            assert table.apply(c, w * 4) == c
+        assert table.apply(c, 'OR') == table.apply(c, 'RO')
+        assert table.apply(c, 'BG') == table.apply(c, 'GB')
+        assert table.apply(c, 'YW') == table.apply(c, 'WY')
+
+
+@pytest.mark.parametrize('name', ['corner_subset_0', 'edge_subset_1'])
+def test_MoveTable_subset_build(name, tables):
+    # Таблица четверки строится целиком, сверяем ее с переходом по ячейкам.
+    size, step = COORDINATES[name]
+    table = tables[name]
+    for c in range(0, size, 101):
+        for w in MOVE_ORDER:
+            assert table.move(c, w) == step(c, MOVES[w])
+
+
+def test_MoveTable_orientation(tables):
+    # Грань O не меняет ориентаций, а B разворачивает и углы, и ребра.
+    assert tables['corner_twist'].move(0, 'O') == 0
+    assert tables['edge_flip'].move(0, 'O') == 0
+    assert tables['corner_twist'].move(0, 'B') != 0
+    assert tables['edge_flip'].move(0, 'B') != 0
+
+
+def test_move_table_cached_on_disk(tmp_path):
+    table = move_table('edge_flip', tmp_path)
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1
+
+    with MoveTable.load('edge_flip', files[0]) as loaded:
+        assert isinstance(loaded._data, memoryview)
+        assert list(loaded._data) == list(table._data)
+        assert MoveTable.build('edge_flip')._data.tolist() == \
+            list(loaded._data)
+    release(table)
+
+
+def test_MoveTable_close(tmp_path):
+    path = tmp_path / 'edge_flip.bin'
+    MoveTable.build('edge_flip').save(path)
+    table = MoveTable.load('edge_flip', path)
+    mm = table._mmap
+    table.close()
+    assert mm.closed
+    with pytest.raises(ValueError):
+        table.move(0, 'O')
+    table.close()
+
+    path.write_bytes(b'\0' * 10)
+    with pytest.raises(ValueError):
+        MoveTable.load('edge_flip', path)
+
+
+@pytest.mark.parametrize('name', ['edge_flip', 'edge_perm_0'])
+def test_pattern_table(name, tmp_path):
+    dist = pattern_table(name, tmp_path)
+    table = move_table(name, tmp_path)
+    goal = CubieState().coordinates()[name]
+    assert dist[goal] == 0
+    assert len(dist) == table.size and 255 not in dist
+    for c in range(0, table.size, 7):
+        nexts = [dist[table.move(c, w)] for w in MOVE_ORDER]
+        assert min(nexts) + 1 >= dist[c]
+        assert c == goal or min(nexts) + 1 == dist[c]
+    assert len(list(tmp_path.glob(f'{name}.pdb.*'))) == 1
+    release(table)
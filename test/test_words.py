@@ -1,6 +1,13 @@
+from itertools import islice, product
+import random
 from math import comb
 from rubik.words import total_words_volume, word, ACT, _combination_of_splits
-from rubik.words import Cycle3Lexica
+from rubik.words import inverse_word, reduce_runs, normalize_word
+from rubik.words import Cycle3Lexica, words_gen, commutator_vocab
+from rubik.words import dense_word
+from rubik.words import canonical_words_gen, canonical_words_volume
+from rubik.words import _commutator_words, _words_shard, _write_checkpoint
+from rubik.permutation import Permutation
 from rubik.state import Rubik
 import pytest
 
@@ -20,6 +27,24 @@ def test_word(ws):
     assert pw == pc
 
 
+@pytest.mark.parametrize('ws', check_word_list)
+def test_inverse_word(ws):
+    p = word(ws) * word(inverse_word(ws))
+    assert p.len() == 0
+
+
+@pytest.mark.parametrize('ws, answer', [
+    ('OOOO', ''),
+    ('OBBBBO', 'OO'),
+    ('ROOOOOR', 'ROR'),
+    ('GGGGGG', 'GG'),
+    ('OBBO', 'OBBO'),
+])
+def test_reduce_runs(ws, answer):
+    assert reduce_runs(ws) == answer
+    assert word(reduce_runs(ws)) == word(ws)
+
+
 @pytest.mark.parametrize('act', 'OBYGWR')
 def test_ACT(act):
     cube = Rubik()
@@ -110,3 +135,243 @@ def test_Cycle3Lexica_add():
     # Assert
     assert len(cl.vocab) == 3
     assert cl.get((13, 14, 17)) == w1
+
+
+def test_Cycle3Lexica_merge():
+    cl = Cycle3Lexica()
+    w1 = 'BWYBWRWGWOBWYBWRWGWO'
+    cl.add(w1)
+    cl.merge({(13, 14, 17): w1 * 4, (1, 2, 3): 'OB'})
+    assert cl.get((13, 14, 17)) == w1
+    assert cl.get((1, 2, 3)) == 'OB'
+
+
+def test__words_shard():
+    words = [w for prefix in ACT for w, _ in _words_shard(prefix, 4, 2)]
+    answer = [w for w, p in words_gen(4, 2)
+              if p.deg() % 7 == 0 or p.deg() % 5 == 0]
+    assert words == answer
+
+
+def test_commutator_vocab():
+    words_a = ['OOBOY', 'OOBGY', 'OOBGW', 'OOBYW', 'OOBYY', 'OOBWW']
+    words_b = ['OOBBB', 'OOYYY', 'BGORG', 'GRWOO', 'YBBBG', 'WBGGG',
+               'BGROG', 'OGRWO', 'BBBBO']
+    words_a = {w: dense_word(w) for w in words_a}
+    words_b = {w: dense_word(w) for w in words_b}
+
+    cl = Cycle3Lexica()
+    log = list(_commutator_words(words_a, words_b, progress=False))
+    cl.add(*log)
+
+    vocab, parallel_log = commutator_vocab(words_a, words_b, processes=2)
+    assert len(log) > 0
+    assert parallel_log == log
+    assert vocab == cl.vocab
+
+
+@pytest.mark.parametrize('n, k', [(0, 0), (1, 1), (1, 2), (3, 2), (4, 3),
+                                  (4, 5), (3, 4)])
+def test_words_gen(n, k):
+    words = list(words_gen(n, k))
+    answer = [''.join(arr) for arr in product(ACT, repeat=n)
+              if len(set(arr)) >= k]
+    assert [w for w, _ in words] == answer
+    assert all(p == dense_word(w) for w, p in words)
+    if n > 0:
+        assert len(words) == total_words_volume(n, k)
+
+
+def test_words_gen_prefix():
+    words = [w for w, _ in words_gen(4, 3, 'oo')]
+    answer = [w for w, _ in words_gen(4, 3) if w.startswith('OO')]
+    assert words == answer
+    assert list(words_gen(2, 2, 'OOB')) == []
+
+
+@pytest.mark.parametrize('n, k', [(1, 0), (2, 2), (3, 2), (4, 3), (5, 2)])
+def test_canonical_words_volume(n, k):
+    words = list(canonical_words_gen(n, k))
+    assert len(words) == canonical_words_volume(n, k)
+    assert len(set(w for w, _ in words)) == len(words)
+
+
+def test_canonical_words_gen():
+    words = [w for w, _ in canonical_words_gen(5, 0)]
+    assert 'OOOOB' not in words
+    assert 'ROB' + 'BB' not in words
+    assert 'OR' + 'BBB' in words
+    assert all(p == dense_word(w) for w, p in canonical_words_gen(4, 2))
+
+    # Канонические слова дают те же перестановки, что и все слова.
+    perms, canonical = set(), set()
+    for n in range(5):
+        perms |= {p for _, p in words_gen(n, 0)}
+        canonical |= {p for _, p in canonical_words_gen(n, 0)}
+    assert perms == canonical
+
+
+def test_Cycle3Lexica_uncovered_triplets():
+    cl = Cycle3Lexica()
+    vertex, edge = cl.uncovered_triplets()
+    assert len(set(vertex)) == len(vertex) == 112
+    assert len(set(edge)) == len(edge) == 440
+
+    ws = 'OOBOYOOBBBOOBOYOOBBB'
+    cl.add(ws)
+    _, edge = cl.uncovered_triplets()
+    assert len(edge) == 439
+
+
+def test_Cycle3Lexica_complete_by_conjugation():
+    ws = 'OOBOYOOBBBOOBOYOOBBB'
+    cl = Cycle3Lexica()
+    cl.add(ws)
+    new_words = cl.complete_by_conjugation(3)
+
+    assert len(cl.vocab) == len(new_words) + 1 > 2
+    _, edge = cl.uncovered_triplets()
+    assert len(edge) == 440 - len(cl.vocab)
+    for triplet, w in cl.vocab.items():
+        cycles = dense_word(w).cycles()
+        assert len(cycles) == 1
+        assert cl._standart_triplet(cycles[0]) == triplet
+
+    # Повторное достроение от той же затравки ничего не меняет.
+    seeds = {cl._standart_triplet(dense_word(ws).cycles()[0]): ws}
+    assert cl.complete_by_conjugation(3, seeds) == []
+
+
+def test_Cycle3Lexica_fill_unknown_triplets():
+    cl = Cycle3Lexica()
+    cl.add('OOBOYOOBBBOOBOYOOBBB')
+    cl.complete_by_conjugation(2)
+    items = list(cl.vocab.items())
+
+    answer = []
+    for (tr1, w1), (tr2, w2) in product(items, items):
+        q = Permutation().apply_cycle(tr1) * Permutation().apply_cycle(tr2)
+        if q.len() == 3:
+            answer.append(w1 + w2)
+    expected = Cycle3Lexica()
+    expected.vocab = dict(cl.vocab)
+    expected.add(*answer)
+
+    assert cl.fill_unknown_triplets() == answer
+    assert cl.vocab == expected.vocab
+
+
+def test_Cycle3Lexica_fill_unknown_triplets_fixpoint():
+    cl = Cycle3Lexica()
+    cl.add('OOBOYOOBBBOOBOYOOBBB')
+    cl.complete_by_conjugation(2)
+    cl.fill_unknown_triplets(rounds=None)
+    _, edge = cl.uncovered_triplets()
+    assert edge == []
+    for triplet, ws in list(cl.vocab.items())[::20]:
+        assert cl._standart_triplet(dense_word(ws).cycles()[0]) == triplet
+
+
+@pytest.fixture
+def small_bruteforse(monkeypatch):
+    """ bruteforse на первых 300 словах, чтобы перебор шел доли секунды. """
+    import rubik.words
+    gen = rubik.words.words_gen
+    monkeypatch.setattr(rubik.words, 'words_gen',
+                        lambda n, k: islice(gen(n, k), 300))
+    return rubik.words
+
+
+def test_Cycle3Lexica_bruteforse_resume(tmp_path, small_bruteforse):
+    full = Cycle3Lexica()
+    full.bruteforse(tmp_path / 'full.txt')
+    full_log = (tmp_path / 'full.txt').read_text()
+    assert len(full.vocab) > 0
+
+    shard = small_bruteforse._commutator_shard
+    calls = []
+
+    def interrupted(*args):
+        calls.append(1)
+        if len(calls) > 3:
+            raise KeyboardInterrupt
+        return shard(*args)
+
+    checkpoint = tmp_path / 'checkpoint.json'
+    log_file = tmp_path / 'log.txt'
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(small_bruteforse, '_commutator_shard', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            Cycle3Lexica().bruteforse(log_file, checkpoint=checkpoint,
+                                      checkpoint_every=4)
+    assert checkpoint.exists()
+    # Мусор после контрольной точки отбрасывается при возобновлении.
+    with open(log_file, 'a') as f:
+        f.write('GARBAGE\n')
+
+    resumed = Cycle3Lexica.resume(checkpoint, log_file, checkpoint_every=4)
+    assert resumed.vocab == full.vocab
+    assert log_file.read_text() == full_log
+
+    # Законченный перебор повторно не запускается.
+    again = Cycle3Lexica.resume(checkpoint, log_file)
+    assert again.vocab == full.vocab
+    assert log_file.read_text() == full_log
+
+
+def test_Cycle3Lexica_bruteforse_batch(tmp_path, small_bruteforse):
+    pytest.importorskip('numpy')
+    plain = Cycle3Lexica()
+    plain.bruteforse(tmp_path / 'plain.txt')
+    batched = Cycle3Lexica()
+    batched.bruteforse(tmp_path / 'batch.txt', batch_size=64)
+    assert len(plain.vocab) > 0
+    assert batched.vocab == plain.vocab
+    assert (tmp_path / 'batch.txt').read_text() == \
+        (tmp_path / 'plain.txt').read_text()
+
+
+def test_Cycle3Lexica_resume_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Cycle3Lexica.resume(tmp_path / 'missing.json')
+
+
+def test_Cycle3Lexica_resume_lost_log(tmp_path):
+    checkpoint = tmp_path / 'checkpoint.json'
+    log_file = tmp_path / 'log.txt'
+    _write_checkpoint(checkpoint, {'row': 4, 'done': False, 'log_size': 10,
+                                   'vocab': dict()})
+    with pytest.raises(ValueError):
+        Cycle3Lexica.resume(checkpoint, log_file)
+    assert not log_file.exists()
+
+    log_file.write_text('OB\n')
+    with pytest.raises(ValueError):
+        Cycle3Lexica.resume(checkpoint, log_file)
+    assert log_file.read_text() == 'OB\n'
+
+
+@pytest.mark.parametrize('ws, answer', [
+    ('OOOO', ''),
+    ('OBBBBO', 'OO'),
+    ('ORO', 'OOR'),
+    ('ROOOOR', 'RR'),
+    ('BOROOOB', 'BRB'),
+    ('GBGGGB', 'BB'),
+    ('YWWWWYYO', 'YYYO'),
+    ('BOOOOOG', 'BOG'),
+])
+def test_normalize_word(ws, answer):
+    assert normalize_word(ws) == answer
+    assert word(normalize_word(ws)) == word(ws)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_normalize_word_random(seed):
+    rng = random.Random(seed)
+    ws = ''.join(rng.choice('OBYWGRRROO') for _ in range(60))
+    norm = normalize_word(ws)
+    assert dense_word(norm) == dense_word(ws)
+    assert len(norm) <= len(ws)
+    assert normalize_word(norm) == norm
+    assert [w for w, _ in canonical_words_gen(len(norm), 0, norm)] == [norm]